@@ -1,15 +1,29 @@
 import sys
+import os
+import mmap
+import time
+# 시작 단계별 시각 기록 (--startup-report)
+STARTUP_MARKS = [('start', time.perf_counter())]
+def startup_mark(stage):
+    STARTUP_MARKS.append((stage, time.perf_counter()))
+import json
+import threading
 import numpy as np
-import pubchempy as pcp
-import requests
-from rdkit import Chem
-from collections import Counter
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QLineEdit, QPushButton, QCheckBox, QLabel, QFrame
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+from itertools import combinations, permutations, product
+from math import comb, factorial
+startup_mark('import numpy')
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QLineEdit, QPushButton, QCheckBox, QLabel, QFrame, QSlider, QComboBox, QGridLayout, QTableWidget, QTableWidgetItem, QAbstractItemView
 from PyQt5.QtGui import QFont, QPalette, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QObject, pyqtSignal
+startup_mark('import PyQt5')
 import pyvista as pv
 from pyvistaqt import QtInteractor
-from itertools import combinations, permutations
+from vtkmodules.vtkRenderingCore import vtkWorldPointPicker
+startup_mark('import pyvista')
 
 ELEMENT_PROPERTIES = {
     'H':  (1.20, 2.20, 13.6, 0.75, '#B0BEC5', ['1s'], 0.53, (False, False), '비금속', 1),
@@ -396,6 +410,46 @@ PERIODIC_TABLE_GRID = [
     ["", "", "Ac","Th","Pa","U", "Np","Pu","Am","Cm","Bk","Cf","Es","Fm","Md","No","Lr",""]
 ]
 
+def hex_to_rgb(colors):
+    if isinstance(colors, np.ndarray):
+        return colors.astype(np.uint8).reshape(-1, 3)
+    colors = [c.lstrip('#') for c in colors]
+    return np.array([[int(c[k:k+2], 16) for k in (0, 2, 4)] for c in colors], dtype=np.uint8).reshape(-1, 3)
+
+def _build_element_table():
+    """
+    ELEMENT_PROPERTIES/ELEMENT_ORBITAL_RADII를 원자번호로 인덱싱하는 열 지향 배열로 변환.
+    0번 행은 알 수 없는 원소(회색, 반지름 1.5)이고 값이 없는 항목은 NaN이다.
+    """
+    dtype = [('symbol', 'U3'), ('vdw_radius', 'f8'), ('en', 'f8'), ('ie', 'f8'), ('ea', 'f8'),
+             ('rgb', 'u1', (3,)), ('atomic_radius', 'f8'), ('group', 'i8'), ('classification', 'U8'),
+             ('orbital_s', 'f8'), ('orbital_p', 'f8'), ('orbital_d', 'f8')]
+    groups = {}
+    for row, line in enumerate(PERIODIC_TABLE_GRID):
+        for col, sym in enumerate(line):
+            if sym:
+                # 란타넘족/악티늄족 행은 3족으로 취급
+                groups[sym] = 3 if row >= 7 else col + 1
+    max_z = max(prop[9] for prop in ELEMENT_PROPERTIES.values())
+    table = np.zeros(max_z + 1, dtype=dtype)
+    for name in ('en', 'ie', 'ea', 'orbital_s', 'orbital_p', 'orbital_d'):
+        table[name] = np.nan
+    table['vdw_radius'] = table['atomic_radius'] = 1.5
+    table['rgb'] = (0x9E, 0x9E, 0x9E)
+    nan = lambda v: np.nan if v is None else v
+    for sym, prop in ELEMENT_PROPERTIES.items():
+        orb = ELEMENT_ORBITAL_RADII.get(sym, {})
+        table[prop[9]] = (sym, prop[0], nan(prop[1]), nan(prop[2]), nan(prop[3]), tuple(hex_to_rgb([prop[4]])[0]),
+                          prop[6], groups.get(sym, 0), prop[8],
+                          nan(orb.get('s')), nan(orb.get('px', orb.get('pz'))), nan(orb.get('dz2')))
+    return table
+
+ELEMENT_TABLE = _build_element_table()
+ATOMIC_NUMBERS = {sym: prop[9] for sym, prop in ELEMENT_PROPERTIES.items()}
+
+def atomic_numbers(symbols):
+    return np.fromiter((ATOMIC_NUMBERS.get(s, 0) for s in symbols), dtype=np.int64)
+
 
 
 
@@ -405,12 +459,73 @@ HYDROGEN_ORBITAL_RADII = {
 
 MOLECULE_CACHE = {}
 
+class Tracer:
+    """
+    단계별 구간(span)과 카운터 기록. 시각은 프로세스 시작(STARTUP_MARKS[0]) 기준이며
+    export()는 Chrome trace-event JSON(chrome://tracing, Perfetto)으로 저장한다.
+    """
+    def __init__(self, max_events=200000):
+        self.t0 = STARTUP_MARKS[0][1]
+        self.events = deque(maxlen=max_events)
+        self.last = {}
+        self.counters = {}
+    def _event(self, name, ph, start, **fields):
+        event = {'name': name, 'ph': ph, 'ts': (start - self.t0) * 1e6,
+                 'pid': os.getpid(), 'tid': threading.get_ident()}
+        event.update(fields)
+        self.events.append(event)
+    @contextmanager
+    def span(self, name, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._event(name, 'X', start, dur=(end - start) * 1e6, args=args)
+            self.last[name] = (end - start) * 1000
+    def count(self, name, **values):
+        self.counters.update(values)
+        self._event(name, 'C', time.perf_counter(), args=values)
+    def summary(self, names):
+        lines = [f"{name}: {self.last[name]:.1f} ms" for name in names if name in self.last]
+        lines += [f"{k}: {v:,}" for k, v in self.counters.items()]
+        return "\n".join(lines)
+    def export(self, path):
+        # 시작 단계도 구간으로 함께 내보낸다
+        startup = []
+        for (_, prev), (stage, t) in zip(STARTUP_MARKS, STARTUP_MARKS[1:]):
+            startup.append({'name': stage, 'cat': 'startup', 'ph': 'X', 'ts': (prev - self.t0) * 1e6,
+                            'dur': (t - prev) * 1e6, 'pid': os.getpid(), 'tid': 0})
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': startup + list(self.events), 'displayTimeUnit': 'ms'}, f)
+
+TRACER = Tracer()
+TRACE_STAGES = ['fetch', 'parse', 'build_meshes', 'get_bond_info', 'orbitals', 'contacts', 'labels', 'render', 'redraw']
+
+def scene_counts(renderer):
+    """렌더러의 액터 수와 다각형(삼각형) 수"""
+    actors = triangles = 0
+    for actor in renderer.actors.values():
+        actors += 1
+        mapper = actor.GetMapper() if hasattr(actor, 'GetMapper') else None
+        data = mapper.GetInput() if mapper is not None and hasattr(mapper, 'GetInput') else None
+        if data is not None and hasattr(data, 'GetNumberOfPolys'):
+            triangles += data.GetNumberOfPolys()
+    return actors, triangles
+
+
 def fetch_3d_sdf_and_iupac_any(inp):
     key = inp.strip().lower()
     if key in KOR_TO_ENG:
         inp = KOR_TO_ENG[key]
     if inp in MOLECULE_CACHE:
         return MOLECULE_CACHE[inp]
+    # SMILES 전용 문법이 있는 입력만 네트워크 없이 바로 3D로 만든다
+    if looks_like_smiles(inp):
+        result = local_3d_result(inp)
+        MOLECULE_CACHE[inp] = result
+        return result
+    import pubchempy as pcp
     tried = []
     for search_type in ['name', 'formula', 'smiles', 'cid']:
         try:
@@ -448,8 +563,16 @@ def _fetch_sdf_and_names(comp, inp, input_type='name'):
         getattr(comp, 'synonyms', [])[0].lower() if getattr(comp, 'synonyms', None) else '',
         str(cid)
     ])
+    import requests
     url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/SDF?record_type=3d"
     resp = requests.get(url, timeout=10)
+    if resp.status_code == 404:
+        # 3D 배좌가 없는 화합물: 2D 레코드를 받아 로컬에서 3D로 임베딩
+        resp = requests.get(url.replace('record_type=3d', 'record_type=2d'), timeout=10)
+        if resp.status_code != 200:
+            raise RuntimeError(f"PubChem REST API 호출 실패: {resp.status_code}")
+        sdf_text = EMBEDDER.embed(resp.text, 'molblock')
+        return sdf_text, iupac_name, formula, synonyms, input_type
     if resp.status_code != 200:
         raise RuntimeError(f"PubChem REST API 호출 실패: {resp.status_code}")
     sdf_text = resp.text
@@ -457,17 +580,662 @@ def _fetch_sdf_and_names(comp, inp, input_type='name'):
         raise RuntimeError("다운로드한 데이터에 3D SDF 형식이 포함되어 있지 않음.")
     return sdf_text, iupac_name, formula, synonyms, input_type
 
+
+EMBED_TIMEOUT = 30
+SMILES_SYNTAX = set('[]=#()/\\@')
+SMILES_AROMATIC = set('bcnops')
+# 대괄호 밖에 올 수 있는 원소 글자 (유기 부분집합과 Cl, Br)
+SMILES_LETTERS = set('BCNOPSFIbcnopslr')
+
+def smiles_heavy_atoms(text):
+    """RDKit이 SMILES로 읽으면 무거운 원자 수, 아니면 0"""
+    from rdkit import Chem, RDLogger
+    RDLogger.DisableLog('rdApp.*')
+    try:
+        mol = Chem.MolFromSmiles(text.strip())
+    finally:
+        RDLogger.EnableLog('rdApp.*')
+    return mol.GetNumHeavyAtoms() if mol is not None else 0
+
+def looks_like_smiles(text):
+    """
+    화학식이나 이름에는 없는 SMILES 전용 문법이 있는지. 대괄호·결합/가지/입체 기호, 원자 뒤의
+    고리 닫기 숫자(숫자마다 짝수 번), 방향족 소문자로 시작하는 경우만 본다.
+    'COS'(황화카보닐)처럼 SMILES로도 읽히는 화학식은 PubChem 검색을 먼저 거친다.
+    문자열 검사를 통과한 경우에만 RDKit으로 실제로 읽히는지 확인한다.
+    """
+    text = text.strip()
+    if not text or ' ' in text:
+        return False
+    outside = ''.join(part.split(']')[-1] for part in text.split('['))
+    if any(c.isalpha() and c not in SMILES_LETTERS for c in outside):
+        return False
+    digits = [c for c in outside if c.isdigit()]
+    ring_closures = bool(digits) and outside[:1].isalpha() and all(digits.count(d) % 2 == 0 for d in digits)
+    if not (any(c in SMILES_SYNTAX for c in text) or ring_closures or text[0] in SMILES_AROMATIC):
+        return False
+    return smiles_heavy_atoms(text) > 0
+
+def embed_3d(text, kind='smiles', seed=0xf00d):
+    """
+    SMILES 또는 2D MOL 블록을 ETKDG로 3D 임베딩하고 MMFF(없으면 UFF)로 다듬은 MOL 블록.
+    프로세스 풀에서 돌도록 모듈 최상위 함수로 둔다.
+    """
+    from rdkit import Chem
+    from rdkit.Chem import AllChem
+    if kind == 'smiles':
+        mol = Chem.MolFromSmiles(text)
+    else:
+        mol = Chem.MolFromMolBlock(text)
+    if mol is None:
+        raise ValueError(f"RDKit이 {kind} 입력을 읽지 못했습니다.")
+    mol = Chem.AddHs(mol)
+    params = AllChem.ETKDGv3()
+    params.randomSeed = seed
+    if AllChem.EmbedMolecule(mol, params) != 0:
+        # 고리가 많은 경우 무작위 좌표에서 다시 시도
+        params.useRandomCoords = True
+        if AllChem.EmbedMolecule(mol, params) != 0:
+            raise RuntimeError("3D 좌표 임베딩에 실패했습니다.")
+    if AllChem.MMFFHasAllMoleculeParams(mol):
+        AllChem.MMFFOptimizeMolecule(mol, maxIters=500)
+    else:
+        AllChem.UFFOptimizeMolecule(mol, maxIters=500)
+    return Chem.MolToMolBlock(mol) + "$$$$\n"
+
+class EmbedPool:
+    """
+    embed_3d를 별도 프로세스 하나에서 실행한다. 시간 초과 시 프로세스를 종료하고 다음 호출 때 새로 만든다
+    (RDKit 임베딩은 중간에 멈출 방법이 없어서).
+    Qt/VTK 스레드와 OpenGL 컨텍스트를 가진 프로세스를 fork하면 잠금이 물린 채 복제될 수 있어 spawn으로 띄운다.
+    """
+    def __init__(self, timeout=EMBED_TIMEOUT):
+        self.timeout = timeout
+        self.pool = None
+    def embed(self, text, kind='smiles'):
+        import multiprocessing
+        if self.pool is None:
+            self.pool = multiprocessing.get_context('spawn').Pool(1)
+        pool = self.pool
+        pending = pool.apply_async(embed_3d, (text, kind))
+        deadline = time.perf_counter() + self.timeout
+        with TRACER.span('embed', kind=kind):
+            # 백그라운드 스레드에서 기다리므로, 종료 때 close()되면 바로 빠져나오도록 잘게 나눠 기다린다
+            while True:
+                try:
+                    return pending.get(0.1)
+                except multiprocessing.TimeoutError:
+                    if self.pool is not pool:
+                        raise RuntimeError("3D 구조 생성이 취소되었습니다.")
+                    if time.perf_counter() > deadline:
+                        self.close()
+                        raise RuntimeError(f"3D 구조 생성이 {self.timeout}초 안에 끝나지 않았습니다.")
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+EMBEDDER = EmbedPool()
+
+def local_3d_result(smiles):
+    """SMILES를 로컬에서 3D로 만들어 fetch_3d_sdf_and_iupac_any와 같은 형태로 돌려준다"""
+    from rdkit import Chem
+    from rdkit.Chem.rdMolDescriptors import CalcMolFormula
+    sdf_text = EMBEDDER.embed(smiles, 'smiles')
+    mol = Chem.MolFromSmiles(smiles)
+    synonyms = {smiles.lower(), Chem.MolToSmiles(mol).lower()}
+    return sdf_text, None, CalcMolFormula(mol), synonyms, 'smiles'
+
+
+RDKIT_BOND_TYPES = {1: 'SINGLE', 2: 'DOUBLE', 3: 'TRIPLE', 4: 'AROMATIC'}
+RELAX_STEPS_PER_FRAME = 10
+RELAX_MAX_FRAMES = 2000
+RELAX_FMAX = 0.1            # kcal/(mol·Å), 원자별 힘의 최대 크기가 이보다 작으면 수렴
+RELAX_FORCE_FIELDS = ('', 'MMFF94', 'UFF')
+
+def to_rdkit_mol(molecule):
+    """Molecule 배열에서 RDKit Mol (좌표 포함). V2000 MOL 블록의 999원자 한계를 피하려고 직접 만든다."""
+    from rdkit import Chem
+    from rdkit.Geometry import Point3D
+    rw = Chem.RWMol()
+    for atom in molecule.atoms:
+        rw.AddAtom(Chem.Atom(atom.symbol))
+    for (i, j), order in zip(molecule.bond_index.tolist(), molecule.bond_orders.tolist()):
+        rw.AddBond(i, j, getattr(Chem.BondType, RDKIT_BOND_TYPES.get(order, 'SINGLE')))
+    conf = Chem.Conformer(len(molecule.atoms))
+    for k, (x, y, z) in enumerate(molecule.positions.tolist()):
+        conf.SetAtomPosition(k, Point3D(x, y, z))
+    mol = rw.GetMol()
+    mol.AddConformer(conf, assignId=True)
+    return mol
+
+def relax_force_field(mol):
+    """
+    MMFF94 힘장, 매개변수가 없으면 UFF. (힘장, 이름, 힘장이 참조하는 Mol)
+    결합 차수가 어긋난 입력(1.5가 2로 반올림된 방향족 등)은 연결과 좌표로 결합 차수를 다시 정한다.
+    """
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import AllChem, rdDetermineBonds
+    RDLogger.DisableLog('rdApp.*')
+    try:
+        Chem.SanitizeMol(mol)
+    except Exception:
+        rw = Chem.RWMol(mol)
+        for bond in rw.GetBonds():
+            bond.SetBondType(Chem.BondType.SINGLE)
+            bond.SetIsAromatic(False)
+        for atom in rw.GetAtoms():
+            atom.SetIsAromatic(False)
+            atom.SetNoImplicit(True)
+        mol = rw.GetMol()
+        try:
+            rdDetermineBonds.DetermineBondOrders(mol, charge=0)
+        except Exception:
+            raise ValueError("원자가가 맞지 않아 힘장을 만들 수 없습니다.")
+    finally:
+        RDLogger.EnableLog('rdApp.*')
+    if AllChem.MMFFHasAllMoleculeParams(mol):
+        props = AllChem.MMFFGetMoleculeProperties(mol)
+        return AllChem.MMFFGetMoleculeForceField(mol, props), 'MMFF94', mol
+    return AllChem.UFFGetMoleculeForceField(mol), 'UFF', mol
+
+class FireMinimizer:
+    """
+    FIRE(Bitzek 2006) 최소화. RDKit의 Minimize()는 (3N)^2 BFGS 헤시안을 호출마다 새로 잡아
+    1k 원자에서 반복당 ~80 ms가 들기 때문에, 힘장의 에너지/기울기만 빌려 반복당 O(N)으로 돈다.
+    단위 질량, 시간 단위는 힘장 단위(Å, kcal/mol) 기준으로 결합 진동보다 충분히 작게 잡았다.
+    """
+    def __init__(self, ff, positions, dt=0.005, dt_max=0.02, max_step=0.05):
+        self.ff = ff
+        self.x = np.asarray(positions, dtype=float).reshape(-1, 3).copy()
+        self.v = np.zeros_like(self.x)
+        self.dt, self.dt_max, self.max_step = dt, dt_max, max_step
+        self.alpha = 0.1
+        self.n_positive = 0
+        self.energy = None
+        self.fmax = np.inf
+    def step(self):
+        flat = self.x.ravel().tolist()
+        # MMFF의 CalcGrad(pos)는 같은 좌표의 CalcEnergy(pos)가 채운 캐시를 쓰므로 에너지를 먼저 구한다
+        self.energy = self.ff.CalcEnergy(flat)
+        f = -np.asarray(self.ff.CalcGrad(flat)).reshape(-1, 3)
+        self.fmax = float(np.sqrt((f * f).sum(axis=1)).max())
+        if self.fmax < RELAX_FMAX:
+            return True
+        if np.vdot(f, self.v) > 0:
+            self.v = (1 - self.alpha) * self.v + self.alpha * f * (np.linalg.norm(self.v) / np.linalg.norm(f))
+            if self.n_positive > 5:
+                self.dt = min(self.dt * 1.1, self.dt_max)
+                self.alpha *= 0.99
+            self.n_positive += 1
+        else:
+            self.v[:] = 0.0
+            self.alpha = 0.1
+            self.dt *= 0.5
+            self.n_positive = 0
+        self.v += self.dt * f
+        dr = self.dt * self.v
+        longest = np.sqrt((dr * dr).sum(axis=1)).max()
+        if longest > self.max_step:
+            # 한 원자가 max_step보다 멀리 가지 않게 줄이고 속도도 맞춰 줄인다
+            dr *= self.max_step / longest
+            self.v = dr / self.dt
+        self.x += dr
+        return False
+
+def relax_worker(mol, shm_name, stop, steps=RELAX_STEPS_PER_FRAME, max_frames=RELAX_MAX_FRAMES):
+    """
+    별도 프로세스에서 steps번씩 최소화하며 좌표를 공유 메모리에 쓴다.
+    버퍼: [seq, energy, done, 힘장 번호, x0, y0, z0, ...]. seq는 쓰는 동안 홀수(seqlock)라
+    읽는 쪽이 찢어진 프레임을 버린다.
+    """
+    from multiprocessing import shared_memory
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buf = np.ndarray((4 + 3 * mol.GetNumAtoms(),), dtype=np.float64, buffer=shm.buf)
+    try:
+        ff, name, mol = relax_force_field(mol)
+        buf[3] = RELAX_FORCE_FIELDS.index(name)
+        ff.Initialize()
+        fire = FireMinimizer(ff, ff.Positions())
+        for _ in range(max_frames):
+            if stop.is_set():
+                break
+            converged = any(fire.step() for _ in range(steps))
+            buf[0] += 1
+            buf[4:] = fire.x.ravel()
+            buf[1] = fire.energy
+            buf[0] += 1
+            if converged:
+                break
+    finally:
+        buf[2] = 1.0
+        del buf
+        shm.close()
+
+class Relaxation:
+    """
+    relax_worker 프로세스와 공유 메모리 버퍼. poll()은 새 프레임이 있으면 좌표 (N,3)를,
+    없으면 None을 돌려준다. 메시 재구성 없이 좌표만 받아 가도록 복사는 한 번만 한다.
+    EmbedPool과 같은 이유로 작업 프로세스는 spawn으로 띄운다.
+    """
+    def __init__(self, molecule):
+        import multiprocessing
+        from multiprocessing import shared_memory
+        mol = to_rdkit_mol(molecule)
+        self.n_atoms = len(molecule.atoms)
+        self.shm = shared_memory.SharedMemory(create=True, size=8 * (4 + 3 * self.n_atoms))
+        self.buf = np.ndarray((4 + 3 * self.n_atoms,), dtype=np.float64, buffer=self.shm.buf)
+        self.buf[:] = 0.0
+        self.seq = 0
+        self.energy = None
+        self.force_field = ''
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.process = context.Process(target=relax_worker, args=(mol, self.shm.name, self.stop_event),
+                                       daemon=True)
+        self.process.start()
+    @property
+    def done(self):
+        return self.buf[2] == 1.0 and self.buf[0] == self.seq
+    @property
+    def failed(self):
+        return self.process.exitcode not in (0, None)
+    def poll(self):
+        seq = self.buf[0]
+        if seq == self.seq or int(seq) % 2:
+            return None
+        positions = self.buf[4:].reshape(-1, 3).copy()
+        energy = float(self.buf[1])
+        if self.buf[0] != seq:
+            return None
+        self.seq, self.energy = seq, energy
+        self.force_field = RELAX_FORCE_FIELDS[int(self.buf[3])]
+        return positions
+    def close(self):
+        self.stop_event.set()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        del self.buf
+        self.shm.close()
+        self.shm.unlink()
+
 def parse_mol(sdf_text):
+    from rdkit import Chem
     mol = Chem.MolFromMolBlock(sdf_text, removeHs=False)
     if mol is None:
         raise ValueError("RDKit이 SDF 텍스트를 파싱하지 못했습니다.")
     return mol
 
+def _fixed_width_columns(lines, widths):
+    # 고정폭 레코드 줄들을 (줄 수, 열 수) 바이트 문자열 배열로 자른다
+    total = sum(widths)
+    raw = ''.join(line[:total].ljust(total) for line in lines).encode('ascii', 'replace')
+    buf = np.frombuffer(raw, dtype='S1').reshape(len(lines), total)
+    cols, start = [], 0
+    for w in widths:
+        cols.append(np.ascontiguousarray(buf[:, start:start+w]).view(f'S{w}').ravel())
+        start += w
+    return cols
+
+def _read_v2000(lines, n_atoms, n_bonds):
+    atom_lines = lines[4:4+n_atoms]
+    bond_lines = lines[4+n_atoms:4+n_atoms+n_bonds]
+    if len(atom_lines) != n_atoms or len(bond_lines) != n_bonds:
+        raise ValueError("MOL 블록의 원자/결합 줄 수가 카운트 줄과 맞지 않습니다.")
+    x, y, z, _, sym = _fixed_width_columns(atom_lines, (10, 10, 10, 1, 3))
+    positions = np.column_stack([x, y, z]).astype(float)
+    symbols = np.char.strip(sym.astype('U3')).tolist()
+    if n_bonds:
+        i, j, t = _fixed_width_columns(bond_lines, (3, 3, 3))
+        bond_index = np.column_stack([i, j]).astype(np.int64) - 1
+        bond_types = t.astype(np.int64)
+    else:
+        bond_index = np.zeros((0, 2), dtype=np.int64)
+        bond_types = np.zeros(0, dtype=np.int64)
+    return symbols, positions, bond_index, bond_types
+
+def _read_v3000(lines):
+    entries, block, pending = {'ATOM': [], 'BOND': []}, None, ''
+    for line in lines:
+        if not line.startswith('M  V30 '):
+            continue
+        body = pending + line[7:].rstrip()
+        if body.endswith('-'):
+            pending = body[:-1]
+            continue
+        pending = ''
+        if body.startswith('BEGIN '):
+            block = body.split()[1]
+        elif body.startswith('END '):
+            block = None
+        elif block in entries:
+            entries[block].append(body.split())
+    atoms, bonds = entries['ATOM'], entries['BOND']
+    if not atoms:
+        raise ValueError("V3000 블록에서 원자를 찾지 못했습니다.")
+    # V3000은 원자 번호가 연속이 아닐 수 있으므로 번호 → 행 인덱스로 변환
+    atom_ids = np.array([int(a[0]) for a in atoms], dtype=np.int64)
+    order = np.argsort(atom_ids)
+    symbols = [a[1] for a in atoms]
+    positions = np.array([a[2:5] for a in atoms], dtype=float)
+    if bonds:
+        bond_arr = np.array([b[1:4] for b in bonds], dtype=np.int64)
+        bond_index = order[np.searchsorted(atom_ids[order], bond_arr[:, 1:3])]
+        bond_types = bond_arr[:, 0]
+    else:
+        bond_index = np.zeros((0, 2), dtype=np.int64)
+        bond_types = np.zeros(0, dtype=np.int64)
+    return symbols, positions, bond_index, bond_types
+
+def read_molblock(sdf_text):
+    """
+    RDKit 없이 MOL/SDF 첫 레코드(V2000/V3000)에서 표시용 정보만 읽는다.
+    반환: (제목, 원자 기호 리스트, 좌표 (N,3), 결합 인덱스 (M,2), 결합 차수 (M,))
+    방향족(4)은 1.5, 그 밖의 질의용 결합 종류는 1로 본다.
+    """
+    # 구분자는 줄 맨 앞의 '$$$$'뿐이다 (제목이나 데이터 값 안의 '$$$$'는 무시)
+    end = sdf_text.find('$$$$')
+    while end > 0 and sdf_text[end - 1] != '\n':
+        end = sdf_text.find('$$$$', end + 4)
+    lines = (sdf_text if end < 0 else sdf_text[:end]).splitlines()
+    if len(lines) < 4:
+        raise ValueError("MOL 블록이 너무 짧습니다.")
+    counts = lines[3]
+    try:
+        if 'V3000' in counts:
+            symbols, positions, bond_index, bond_types = _read_v3000(lines[4:])
+        else:
+            symbols, positions, bond_index, bond_types = _read_v2000(lines, int(counts[0:3]), int(counts[3:6]))
+    except (ValueError, IndexError) as e:
+        raise ValueError(f"SDF 텍스트를 파싱하지 못했습니다: {e}")
+    bond_orders = np.where(bond_types == 4, 1.5, np.where((bond_types >= 1) & (bond_types <= 3), bond_types, 1))
+    return lines[0].strip(), symbols, positions, bond_index, bond_orders
+
+def parse_molecule(sdf_text, engine='native'):
+    """
+    engine='native': 내장 파서로 좌표/기호/결합 차수만 읽어 바로 Molecule 생성 (RDKit 불필요)
+    engine='rdkit': RDKit 전체 sanitization으로 검증·화학 인식 후 Molecule 생성
+    """
+    if engine == 'rdkit':
+        return Molecule(parse_mol(sdf_text))
+    if engine != 'native':
+        raise ValueError(f"알 수 없는 파서 엔진: {engine}")
+    _, symbols, positions, bond_index, bond_orders = read_molblock(sdf_text)
+    return Molecule.from_arrays(symbols, positions, bond_index, np.rint(bond_orders).astype(np.int64))
+
+class SDFLibrary:
+    """
+    로컬 다중 레코드 SDF 파일을 mmap으로 열어 레코드를 필요할 때만 Molecule로 읽는다.
+    줄 맨 앞의 '$$$$' 구분자 오프셋 색인은 처음 한 번만 만들고 '<파일>.idx.npz'로 옆에 저장한다.
+    (파일 크기나 수정 시각, 색인 형식이 바뀌면 색인을 다시 만든다)
+    """
+    INDEX_VERSION = 2
+    def __init__(self, path, engine='native'):
+        self.path = path
+        self.engine = engine
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"빈 SDF 파일입니다: {path}")
+        self.starts, self.ends, self.names = self._load_or_build_index()
+        self._name_index = None
+    def _index_path(self):
+        return self.path + '.idx.npz'
+    def _load_or_build_index(self):
+        st = os.stat(self.path)
+        try:
+            with np.load(self._index_path()) as idx:
+                if (int(idx['size']) == st.st_size and int(idx['mtime_ns']) == st.st_mtime_ns
+                        and int(idx['version']) == self.INDEX_VERSION):
+                    return idx['starts'], idx['ends'], idx['names']
+        except (OSError, KeyError, ValueError):
+            pass
+        starts, ends, names = self._build_index()
+        try:
+            np.savez(self._index_path(), starts=starts, ends=ends, names=names,
+                     size=st.st_size, mtime_ns=st.st_mtime_ns, version=self.INDEX_VERSION)
+        except OSError:
+            pass
+        return starts, ends, names
+    def _build_index(self):
+        mm = self._mm
+        size = len(mm)
+        starts, ends = [], []
+        pos = 0
+        while pos < size:
+            end = mm.find(b'$$$$', pos)
+            # 데이터 항목 값이나 제목 줄 중간의 '$$$$'는 구분자가 아니다
+            while end > pos and mm[end - 1:end] != b'\n':
+                end = mm.find(b'$$$$', end + 4)
+            if end < 0:
+                if mm[pos:].strip():
+                    starts.append(pos)
+                    ends.append(size)
+                break
+            starts.append(pos)
+            ends.append(end)
+            nl = mm.find(b'\n', end)
+            pos = size if nl < 0 else nl + 1
+        names = []
+        for start in starts:
+            nl = mm.find(b'\n', start)
+            names.append(mm[start:nl if nl >= 0 else size].decode('utf-8', 'replace').strip())
+        return np.array(starts, dtype=np.int64), np.array(ends, dtype=np.int64), np.array(names, dtype=str)
+    def __len__(self):
+        return len(self.starts)
+    def record_text(self, idx):
+        return self._mm[self.starts[idx]:self.ends[idx]].decode('utf-8', 'replace')
+    def __getitem__(self, idx):
+        if not -len(self) <= idx < len(self):
+            raise IndexError(f"레코드 번호 범위를 벗어남: {idx} (총 {len(self)}개)")
+        return parse_molecule(self.record_text(idx), engine=self.engine)
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+    def index_of(self, name):
+        if self._name_index is None:
+            self._name_index = {}
+            for idx, n in enumerate(self.names.tolist()):
+                self._name_index.setdefault(n.lower(), idx)
+        key = name.strip().lower()
+        if key not in self._name_index:
+            raise ValueError(f"SDF 라이브러리에 '{name}' 레코드가 없습니다.")
+        return self._name_index[key]
+    def get(self, name):
+        return self[self.index_of(name)]
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+BOND_TOLERANCE = 1.3
+# 반쪽 이웃 칸: 자기 칸 + 13칸이면 모든 이웃 칸 쌍을 한 번씩만 본다
+HALF_SHELL = np.array([(0, 0, 0)] + [d for d in product((-1, 0, 1), repeat=3) if d > (0, 0, 0)], dtype=np.int64)
+
+class CellList:
+    """
+    균일 격자 공간 해시. 좌표를 cell_size 칸에 넣고 칸 번호로 정렬해 두면, cutoff <= cell_size인
+    모든 쌍은 자기 칸과 13개 반쪽 이웃 칸 안에 있다. 빈 칸은 저장하지 않으므로 큰 상자도 메모리가 원자 수에 비례한다.
+    """
+    def __init__(self, positions, cell_size):
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.cell_size = float(cell_size)
+        n = len(self.positions)
+        origin = self.positions.min(axis=0) if n else np.zeros(3)
+        # 이웃 칸 번호가 음수/경계 넘김이 되지 않게 한 칸씩 여유를 둔다
+        cells = np.floor((self.positions - origin) / self.cell_size).astype(np.int64) + 1
+        self.dims = (cells.max(axis=0) + 2) if n else np.ones(3, dtype=np.int64)
+        self.strides = np.array([self.dims[1] * self.dims[2], self.dims[2], 1], dtype=np.int64)
+        keys = cells @ self.strides
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.start, self.count = np.unique(keys[self.order], return_index=True, return_counts=True)
+        self.atom_keys = keys
+    def pairs(self, cutoff=None):
+        """거리 < cutoff인 (K,2) 원자 쌍(i < j)과 거리 (K,)"""
+        cutoff = self.cell_size if cutoff is None else min(cutoff, self.cell_size)
+        found_i, found_j = [], []
+        rank = np.empty(len(self.order), dtype=np.int64)
+        rank[self.order] = np.arange(len(self.order))
+        for offset in HALF_SHELL:
+            target = self.atom_keys + offset @ self.strides
+            slot = np.searchsorted(self.keys, target)
+            slot[slot == len(self.keys)] = 0
+            hit = np.flatnonzero(self.keys[slot] == target) if len(self.keys) else np.zeros(0, dtype=np.int64)
+            counts = self.count[slot[hit]]
+            # 원자마다 대상 칸의 원자 수만큼 펼친다 (ragged arange)
+            i = np.repeat(hit, counts)
+            within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = self.order[np.repeat(self.start[slot[hit]], counts) + within]
+            if not offset.any():
+                keep = rank[j] > rank[i]
+                i, j = i[keep], j[keep]
+            d2 = ((self.positions[i] - self.positions[j]) ** 2).sum(axis=1)
+            close = d2 < cutoff * cutoff
+            found_i.append(i[close])
+            found_j.append(j[close])
+        i, j = np.concatenate(found_i), np.concatenate(found_j)
+        pair = np.sort(np.column_stack([i, j]), axis=1)
+        pair = pair[np.lexsort((pair[:, 1], pair[:, 0]))]
+        return pair, np.linalg.norm(self.positions[pair[:, 0]] - self.positions[pair[:, 1]], axis=1)
+
+def perceive_bonds(numbers, positions, tolerance=BOND_TOLERANCE):
+    """
+    좌표만 있는 입력(XYZ 등)의 결합. 두 원자 거리가 원자 반지름 합 * tolerance보다 가까우면 단일 결합으로 본다.
+    (K,2) 결합 원자 쌍을 돌려주며 Molecule.from_arrays의 bond_index로 그대로 쓴다.
+    """
+    numbers = np.asarray(numbers, dtype=np.int64)
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    if len(positions) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    radii = ELEMENT_TABLE['atomic_radius'][numbers]
+    cells = CellList(positions, 2 * radii.max() * tolerance)
+    pair, dist = cells.pairs()
+    return pair[dist < (radii[pair[:, 0]] + radii[pair[:, 1]]) * tolerance]
+
+CONTACT_SCALE = 1.0         # 반데르발스 반지름 합의 이 배수보다 가까우면 접촉
+CLASH_SCALE = 0.8           # 이 배수보다 가까우면 충돌
+CONTACT_RGB = np.array([[255, 213, 79], [239, 83, 80]], dtype=np.uint8)   # 접촉, 충돌
+
+def bonded_pair_keys(n_atoms, bond_index):
+    """1-2, 1-3 관계인 원자 쌍 (i < j)의 i * n + j 키 (정렬됨)"""
+    from scipy.sparse import coo_matrix
+    b = np.asarray(bond_index, dtype=np.int64).reshape(-1, 2)
+    adj = coo_matrix((np.ones(2 * len(b)), (np.concatenate([b[:, 0], b[:, 1]]), np.concatenate([b[:, 1], b[:, 0]]))),
+                     shape=(n_atoms, n_atoms)).tocsr()
+    near = (adj + adj @ adj).tocoo()
+    keep = near.row < near.col
+    return np.sort(near.row[keep].astype(np.int64) * n_atoms + near.col[keep])
+
+def find_contacts(molecule, scale=CONTACT_SCALE):
+    """
+    결합으로 이어진 1-2/1-3 쌍을 뺀, 반데르발스 반지름 합 * scale보다 가까운 원자 쌍.
+    (쌍 (K,2), 거리 (K,), 반지름 합 대비 비율 (K,))
+    """
+    positions = molecule.positions
+    n = len(positions)
+    if n < 2:
+        return np.zeros((0, 2), dtype=np.int64), np.zeros(0), np.zeros(0)
+    radii = ELEMENT_TABLE['vdw_radius'][molecule.numbers]
+    pair, dist = CellList(positions, 2 * radii.max() * scale).pairs()
+    ratio = dist / (radii[pair[:, 0]] + radii[pair[:, 1]])
+    close = ratio < scale
+    pair, dist, ratio = pair[close], dist[close], ratio[close]
+    if len(molecule.bond_index):
+        # np.isin은 해시로 중복을 지워 느리므로 정렬된 키에서 이진 탐색
+        keys = bonded_pair_keys(n, molecule.bond_index)
+        query = pair[:, 0] * n + pair[:, 1]
+        slot = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        far = keys[slot] != query
+        pair, dist, ratio = pair[far], dist[far], ratio[far]
+    return pair, dist, ratio
+
+def dashed_lines(p1, p2, rgb, dashes=5, fill=0.6):
+    """
+    선분마다 같은 수(dashes)의 점선 조각(길이 비율 fill)을 만들어 하나의 PolyData(lines)로 합친다.
+    접촉 거리는 2~4 Å로 비슷해서 조각 수를 고정해도 간격이 고르고, 배열 모양이 일정해 펼치기가 필요 없다.
+    셀 데이터 'rgb'에 조각마다 원래 선분의 색을 넣는다.
+    """
+    p1, p2 = np.asarray(p1, dtype=float), np.asarray(p2, dtype=float)
+    t = np.arange(dashes) / dashes
+    d = (p2 - p1)[:, None, :]
+    points = np.empty((len(p1), dashes, 2, 3))
+    points[:, :, 0] = p1[:, None, :] + d * t[None, :, None]
+    points[:, :, 1] = p1[:, None, :] + d * (t + fill / dashes)[None, :, None]
+    n = len(p1) * dashes
+    lines = np.empty((n, 3), dtype=np.int64)
+    lines[:, 0] = 2
+    lines[:, 1] = np.arange(0, 2 * n, 2)
+    lines[:, 2] = lines[:, 1] + 1
+    poly = pv.PolyData(points.reshape(-1, 3), lines=lines.ravel())
+    poly.cell_data['rgb'] = np.repeat(np.asarray(rgb, dtype=np.uint8), dashes, axis=0)
+    return poly
+
+def contact_polydata(molecule, offset=(0, 0, 0), scale=CONTACT_SCALE):
+    """접촉 쌍을 점선 한 덩어리로. 충돌(비율 < CLASH_SCALE)은 빨강, 나머지는 노랑. (PolyData 또는 None, 접촉 수, 충돌 수)"""
+    pair, _, ratio = find_contacts(molecule, scale)
+    if len(pair) == 0:
+        return None, 0, 0
+    clash = ratio < CLASH_SCALE
+    pos = molecule.positions + np.asarray(offset, dtype=float)
+    return dashed_lines(pos[pair[:, 0]], pos[pair[:, 1]], CONTACT_RGB[clash.astype(np.int64)]), len(pair), int(clash.sum())
+
+class Trajectory:
+    """
+    같은 원자 배열을 공유하는 좌표 프레임 묶음 (F, N, 3).
+    다중 conformer SDF(레코드마다 원자 순서가 같아야 함)나 다중 프레임 XYZ에서 읽는다.
+    """
+    def __init__(self, symbols, frames, bond_index=None, bond_orders=None):
+        self.symbols = list(symbols)
+        self.frames = np.ascontiguousarray(frames, dtype=float)
+        self.bond_index = bond_index
+        self.bond_orders = bond_orders
+        if self.frames.ndim != 3 or self.frames.shape[1:] != (len(self.symbols), 3):
+            raise ValueError("프레임 좌표 배열 모양이 원자 수와 맞지 않습니다.")
+    def __len__(self):
+        return len(self.frames)
+    @classmethod
+    def from_library(cls, library):
+        if len(library) == 0:
+            raise ValueError("빈 SDF 라이브러리입니다.")
+        _, symbols, positions, bond_index, bond_orders = read_molblock(library.record_text(0))
+        frames = np.empty((len(library), len(symbols), 3))
+        frames[0] = positions
+        for idx in range(1, len(library)):
+            _, syms, positions, _, _ = read_molblock(library.record_text(idx))
+            if syms != symbols:
+                raise ValueError(f"{idx + 1}번 레코드의 원자 구성이 첫 레코드와 달라 궤적으로 읽을 수 없습니다.")
+            frames[idx] = positions
+        return cls(symbols, frames, bond_index, np.rint(bond_orders).astype(np.int64))
+    @classmethod
+    def from_xyz(cls, path):
+        with open(path, encoding='utf-8') as f:
+            lines = f.read().rstrip().splitlines()
+        try:
+            n_atoms = int(lines[0].split()[0])
+        except (IndexError, ValueError):
+            raise ValueError("XYZ 파일 첫 줄에 원자 수가 없습니다.")
+        block = n_atoms + 2
+        if len(lines) % block != 0:
+            raise ValueError("XYZ 프레임마다 원자 수가 같아야 합니다.")
+        n_frames = len(lines) // block
+        rows = [lines[f*block + 2 + k].split() for f in range(n_frames) for k in range(n_atoms)]
+        frames = np.array([r[1:4] for r in rows], dtype=float).reshape(n_frames, n_atoms, 3)
+        z_to_symbol = {prop[9]: sym for sym, prop in ELEMENT_PROPERTIES.items()}
+        symbols = [z_to_symbol.get(int(r[0]), r[0]) if r[0].isdigit() else r[0].capitalize() for r in rows[:n_atoms]]
+        # XYZ에는 결합 정보가 없으므로 첫 프레임 좌표에서 결합을 찾는다
+        return cls(symbols, frames, perceive_bonds(atomic_numbers(symbols), frames[0]))
+    def molecule(self, frame=0):
+        return Molecule.from_arrays(self.symbols, self.frames[frame].copy(), self.bond_index, self.bond_orders)
+
 class Atom:
     def __init__(self, idx, symbol, pos):
         self.idx = idx
         self.symbol = symbol
-        self.pos = np.array(pos)
+        self.pos = np.asarray(pos, dtype=float)
         self.neighbors = set()
         self.is_center = False
         self.bond_count = 0
@@ -482,55 +1250,237 @@ class Bond:
         self.order = int(round(order))
 
 class Molecule:
-    def __init__(self, mol):
+    def __init__(self, mol=None):
         self.atoms = []
         self.bonds = []
-        self.build_from_rdkit(mol)
+        self.positions = np.zeros((0, 3))
+        self.numbers = np.zeros(0, dtype=np.int64)
+        self.bond_index = np.zeros((0, 2), dtype=np.int64)
+        self.bond_orders = np.zeros(0, dtype=np.int64)
+        self.vsepr = None
+        if mol is not None:
+            self.build_from_rdkit(mol)
+    @classmethod
+    def from_arrays(cls, symbols, positions, bond_index=None, bond_orders=None, numbers=None):
+        molecule = cls()
+        molecule.build_from_arrays(symbols, positions, bond_index, bond_orders, numbers)
+        return molecule
     def build_from_rdkit(self, mol):
+        # 원자/결합을 한 번에 배열로 꺼내 from_arrays 경로로 구성
         conf = mol.GetConformer()
-        for atom in mol.GetAtoms():
-            idx = atom.GetIdx()
-            pos = conf.GetAtomPosition(idx)
-            self.atoms.append(Atom(idx, atom.GetSymbol(), [pos.x, pos.y, pos.z]))
-        for bond in mol.GetBonds():
-            i, j = bond.GetBeginAtomIdx(), bond.GetEndAtomIdx()
-            order = bond.GetBondTypeAsDouble()
-            self.bonds.append(Bond(i, j, order))
+        atoms = mol.GetAtoms()
+        symbols = [a.GetSymbol() for a in atoms]
+        numbers = np.fromiter((a.GetAtomicNum() for a in atoms), dtype=np.int64, count=len(symbols))
+        # mol.GetBonds() 순회는 결합 수에 대해 O(M^2)이라 원자별 결합 목록에서 시작 원자 쪽만 모은다
+        bond_data = np.array([(b.GetIdx(), b.GetBeginAtomIdx(), b.GetEndAtomIdx(), b.GetBondTypeAsDouble())
+                              for a in atoms for b in a.GetBonds() if b.GetBeginAtomIdx() == a.GetIdx()],
+                             dtype=float).reshape(-1, 4)
+        bond_data = bond_data[np.argsort(bond_data[:, 0], kind='stable')]
+        self.build_from_arrays(symbols, conf.GetPositions(), bond_data[:, 1:3].astype(np.int64),
+                               np.rint(bond_data[:, 3]).astype(np.int64), numbers)
+    def build_from_arrays(self, symbols, positions, bond_index=None, bond_orders=None, numbers=None):
+        self.positions = np.ascontiguousarray(positions, dtype=float).reshape(-1, 3)
+        n_atoms = len(self.positions)
+        symbols = list(symbols)
+        if len(symbols) != n_atoms:
+            raise ValueError(f"원자 기호 수({len(symbols)})와 좌표 수({n_atoms})가 다릅니다.")
+        if numbers is None:
+            numbers = atomic_numbers(symbols)
+        self.numbers = np.asarray(numbers, dtype=np.int64)
+        if bond_index is None:
+            bond_index = np.zeros((0, 2), dtype=np.int64)
+        self.bond_index = np.asarray(bond_index, dtype=np.int64).reshape(-1, 2)
+        if bond_orders is None:
+            bond_orders = np.ones(len(self.bond_index), dtype=np.int64)
+        self.bond_orders = np.asarray(bond_orders, dtype=np.int64)
+        # Atom.pos는 positions 행의 뷰이므로 좌표 배열을 갱신하면 함께 바뀐다
+        self.atoms = [Atom(idx, sym, pos) for idx, (sym, pos) in enumerate(zip(symbols, self.positions))]
+        self.bonds = [Bond(i, j, o) for (i, j), o in zip(self.bond_index.tolist(), self.bond_orders.tolist())]
+        for i, j in self.bond_index.tolist():
             self.atoms[i].neighbors.add(j)
             self.atoms[j].neighbors.add(i)
         for atom in self.atoms:
             atom.update_center_info()
+        self.vsepr = analyze_vsepr(self)
     def atom_summary(self):
         counts = Counter([a.symbol for a in self.atoms])
         lines = []
         for sym, cnt in sorted(counts.items(), key=lambda x: (-x[1], x[0])):
-            prop = ELEMENT_PROPERTIES.get(sym)
-            if prop:
-                en = prop[1]
-                r = prop[0]
-                ie = prop[2]
-                ea = prop[3]
-            else:
-                en = r = ie = ea = '?'
-            lines.append(f"{sym}({cnt}): EN({en}), R({r}), IE1({ie}), EA({ea})")
+            lines.append(f"{sym}({cnt}): {element_info(ATOMIC_NUMBERS.get(sym, 0))}")
         return "\n".join(lines)
     def get_positions(self):
-        return np.array([a.pos for a in self.atoms])
+        return self.positions
     def get_symbols(self):
         return [a.symbol for a in self.atoms]
 
+BOND_ORDER_COLORS = {1: '#78909C', 2: '#AED581', 3: '#33691E'}
+
+def rotation_from_z(directions):
+    """(K,3) 방향 벡터마다 +z축을 그 방향으로 돌리는 회전행렬 (K,3,3)"""
+    d = np.asarray(directions, dtype=float).reshape(-1, 3)
+    d = d / (np.linalg.norm(d, axis=1, keepdims=True) + 1e-12)
+    k = len(d)
+    vx, vy, c = -d[:, 1], d[:, 0], d[:, 2]
+    skew = np.zeros((k, 3, 3))
+    skew[:, 0, 2], skew[:, 1, 2] = vy, -vx
+    skew[:, 2, 0], skew[:, 2, 1] = -vy, vx
+    flipped = c < -1 + 1e-9
+    factor = np.where(flipped, 0.0, 1.0 / np.where(flipped, 1.0, 1.0 + c))
+    rot = np.eye(3) + skew + (skew @ skew) * factor[:, None, None]
+    rot[flipped] = np.diag([1.0, -1.0, -1.0])
+    return rot
+
+class InstancedMesh:
+    """
+    단위 템플릿 메시를 count개 복제해 하나의 PolyData로 합친 메시.
+    좌표/법선/색 버퍼는 생성 시 한 번만 할당하고 이후에는 제자리에서 갱신한다.
+    """
+    def __init__(self, template, count):
+        template = template.triangulate().compute_normals(cell_normals=False, split_vertices=False)
+        self.count = count
+        self.n_verts = template.n_points
+        self.base_points = np.asarray(template.points, dtype=float)
+        self.base_normals = np.asarray(template.point_data['Normals'], dtype=float)
+        tris = template.faces.reshape(-1, 4)[:, 1:]
+        offsets = (np.arange(count) * self.n_verts)[:, None, None]
+        faces = np.empty((count, len(tris), 4), dtype=np.int64)
+        faces[:, :, 0] = 3
+        faces[:, :, 1:] = tris[None] + offsets
+        self.mesh = pv.PolyData(np.zeros((count * self.n_verts, 3)), faces.ravel())
+        self.mesh.point_data['Normals'] = np.zeros((count * self.n_verts, 3))
+        self.mesh.point_data.active_normals_name = 'Normals'
+        self.mesh.point_data['rgba'] = np.full((count * self.n_verts, 4), 255, dtype=np.uint8)
+    def _view(self, name):
+        arr = self.mesh.points if name == 'points' else self.mesh.point_data[name]
+        return arr.reshape(self.count, self.n_verts, -1)
+    def set_transforms(self, ids, matrices, translations):
+        # points[k] = base @ M_k^T + t_k, normals[k] = base_normals @ R_k^T (비균일 스케일은 축 방향만)
+        pts = self._view('points')
+        nrm = self._view('Normals')
+        pts[ids] = self.base_points @ matrices.transpose(0, 2, 1) + translations[:, None, :]
+        rot = matrices / (np.linalg.norm(matrices, axis=1, keepdims=True) + 1e-12)
+        nrm[ids] = self.base_normals @ rot.transpose(0, 2, 1)
+        self.mesh.GetPoints().Modified()
+        self._touch('Normals')
+    def set_colors(self, rgb, ids=slice(None)):
+        self._view('rgba')[ids, :, :3] = np.asarray(rgb, dtype=np.uint8)[:, None, :]
+        self._touch('rgba')
+    def set_alpha(self, alpha, ids=slice(None)):
+        self._view('rgba')[ids, :, 3] = alpha
+        self._touch('rgba')
+    def set_uniform(self, ids, scales, translations):
+        # 균일 스케일(구)은 법선이 템플릿과 같으므로 좌표만 갱신
+        pts = self._view('points')
+        if isinstance(ids, slice):
+            np.multiply(self.base_points[None], scales[:, None, None], out=pts[ids])
+            pts[ids] += translations[:, None, :]
+        else:
+            pts[ids] = self.base_points[None] * scales[:, None, None] + translations[:, None, :]
+        self.mesh.GetPoints().Modified()
+        self.mesh.Modified()
+    def _touch(self, name):
+        self.mesh.GetPointData().GetArray(name).Modified()
+        self.mesh.Modified()
+
+def _unit_sphere(count=0):
+    # 원자 수가 많으면 구 해상도를 낮춰 정점 수를 줄인다
+    res = 32 if count <= 2000 else 16 if count <= 20000 else 8
+    return pv.Sphere(radius=1.0, center=(0, 0, 0), theta_resolution=res, phi_resolution=res)
+
+def _unit_cylinder():
+    return pv.Cylinder(center=(0, 0, 0.5), direction=(0, 0, 1), radius=1.0, height=1.0, resolution=24)
+
+class MoleculeMeshes:
+    """원자 구/결합 원기둥을 각각 하나의 인스턴스 메시로 관리. 좌표가 바뀌면 버퍼만 갱신한다."""
+    def __init__(self, positions, radii, atom_colors, bond_index=None, bond_colors=None, bond_radius=0.13):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=float)
+        self.bond_index = np.zeros((0, 2), dtype=np.int64) if bond_index is None else np.asarray(bond_index, dtype=np.int64)
+        self.bond_radius = bond_radius
+        self.atoms = InstancedMesh(_unit_sphere(len(positions)), len(positions))
+        self.atom_rgb = hex_to_rgb(atom_colors)
+        self.recolored = False
+        self.atoms.set_colors(self.atom_rgb)
+        self.atoms._view('Normals')[:] = self.atoms.base_normals
+        self.bonds = None
+        if len(self.bond_index):
+            self.bonds = InstancedMesh(_unit_cylinder(), len(self.bond_index))
+            self.bonds.set_colors(hex_to_rgb(bond_colors))
+        self.update_positions(positions)
+    def update_positions(self, positions, atom_ids=None, bond_ids=None):
+        positions = np.asarray(positions, dtype=float)
+        if atom_ids is None:
+            self.atoms.set_uniform(slice(None), self.radii, positions)
+        else:
+            atom_ids = np.asarray(atom_ids, dtype=np.int64)
+            self.atoms.set_uniform(atom_ids, self.radii[atom_ids], positions[atom_ids])
+        if self.bonds is None:
+            return
+        if bond_ids is None:
+            bond_ids = slice(None)
+        else:
+            bond_ids = np.asarray(bond_ids, dtype=np.int64)
+        p1 = positions[self.bond_index[bond_ids, 0]]
+        p2 = positions[self.bond_index[bond_ids, 1]]
+        axis = p2 - p1
+        length = np.linalg.norm(axis, axis=1)
+        scale = np.zeros((len(p1), 3, 3))
+        scale[:, 0, 0] = scale[:, 1, 1] = self.bond_radius
+        scale[:, 2, 2] = length
+        self.bonds.set_transforms(bond_ids, rotation_from_z(axis) @ scale, p1)
+    def highlight(self, idx, alpha=51):
+        self.atoms.set_alpha(255)
+        if idx is not None:
+            self.atoms.set_alpha(alpha, [idx])
+
+class AtomIndex:
+    """
+    원자 중심 좌표의 KD-tree. 분자마다 한 번 만들어 두고 클릭/호버한 표면 점에서
+    표면이 가장 가까운 원자를 O(log N)으로 찾는다.
+    """
+    def __init__(self, positions, radii):
+        from scipy.spatial import cKDTree
+        self.positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        self.radii = np.asarray(radii, dtype=float)
+        self.max_radius = float(self.radii.max()) if len(self.radii) else 0.0
+        self.tree = cKDTree(self.positions) if len(self.positions) else None
+    def pick(self, point, tolerance=0.25):
+        if self.tree is None:
+            return None
+        cand = self.tree.query_ball_point(np.asarray(point, dtype=float), self.max_radius + tolerance)
+        if not cand:
+            return None
+        cand = np.asarray(cand)
+        gap = np.abs(np.linalg.norm(self.positions[cand] - point, axis=1) - self.radii[cand])
+        k = int(np.argmin(gap))
+        # 구 테셀레이션 오차를 감안해 반지름에 비례한 여유를 둔다
+        if gap[k] > tolerance + 0.1 * self.radii[cand[k]]:
+            return None
+        return int(cand[k])
+    def nearest(self, point):
+        if self.tree is None:
+            return None
+        _, i = self.tree.query(np.asarray(point, dtype=float))
+        return int(i)
+
+def element_info(z):
+    """원소 요약 문자열. 값이 없는 항목은 None으로 표시"""
+    if z == 0:
+        return "EN(?), R(?), IE1(?), EA(?)"
+    row = ELEMENT_TABLE[z]
+    fmt = lambda v: None if np.isnan(v) else float(v)
+    return f"EN({fmt(row['en'])}), R({fmt(row['vdw_radius'])}), IE1({fmt(row['ie'])}), EA({fmt(row['ea'])})"
+
+def display_radii(numbers):
+    return 0.35 + 0.35 * (ELEMENT_TABLE['vdw_radius'][numbers] - 1.0) / (2.2 - 1.0)
+
+def element_colors(numbers):
+    return ELEMENT_TABLE['rgb'][numbers]
+
 def build_meshes(molecule):
-    atoms, bonds = [], []
-    for atom in molecule.atoms:
-        prop = ELEMENT_PROPERTIES.get(atom.symbol, None)
-        color = prop[4] if prop and prop[4] else '#9E9E9E'
-        r = 0.35 + 0.35 * ((prop[0] if prop and prop[0] else 1.5) - 1.0) / (2.2 - 1.0)
-        atoms.append((pv.Sphere(radius=r, center=atom.pos.tolist(), theta_resolution=32, phi_resolution=32), color))
-    for bond in molecule.bonds:
-        p1, p2 = molecule.atoms[bond.idx1].pos, molecule.atoms[bond.idx2].pos
-        color = {1: '#78909C', 2: '#AED581', 3: '#33691E'}.get(bond.order, '#78909C')
-        bonds.append((pv.Cylinder(center=((p1+p2)/2).tolist(), direction=(p2-p1).tolist(), radius=0.13, height=np.linalg.norm(p2-p1), resolution=24), color))
-    return atoms, bonds
+    bond_colors = [BOND_ORDER_COLORS.get(int(o), '#78909C') for o in molecule.bond_orders]
+    return MoleculeMeshes(molecule.positions, display_radii(molecule.numbers), element_colors(molecule.numbers),
+                          molecule.bond_index, bond_colors)
 
 def get_bond_info(molecule):
     bonds, centers, lengths = [], [], []
@@ -559,6 +1509,77 @@ def get_bond_info(molecule):
     return bonds, centers, lengths, angles
 
 
+def angle_labels(positions, triples):
+    """(A,3) 각 (끝, 중심, 끝)마다 각도(도)와 라벨 위치. get_bond_info의 각 계산을 배열로 한 것"""
+    triples = np.asarray(triples, dtype=np.int64).reshape(-1, 3)
+    center = positions[triples[:, 1]]
+    v1 = positions[triples[:, 0]] - center
+    v2 = positions[triples[:, 2]] - center
+    cos = np.einsum('ij,ij->i', v1, v2) / (np.linalg.norm(v1, axis=1) * np.linalg.norm(v2, axis=1))
+    angle = np.degrees(np.arccos(np.clip(cos, -1, 1)))
+    normal = np.cross(v1, v2)
+    normal[np.linalg.norm(normal, axis=1) < 1e-6] = (0, 0, 1)
+    normal /= np.linalg.norm(normal, axis=1, keepdims=True) + 1e-8
+    return center + (v1 + v2) / 4 + normal * 0.5, angle
+
+def incidence(n_atoms, index):
+    """(K,w) 원자 번호 배열에서 원자별로 자신이 들어 있는 행 번호 목록 (CSR: indptr, rows)"""
+    index = np.asarray(index, dtype=np.int64)
+    atoms = index.ravel()
+    rows = np.repeat(np.arange(len(index)), index.shape[1] if index.ndim == 2 else 1)
+    order = np.argsort(atoms, kind='stable')
+    indptr = np.zeros(n_atoms + 1, dtype=np.int64)
+    np.cumsum(np.bincount(atoms, minlength=n_atoms), out=indptr[1:])
+    return indptr, rows[order]
+
+class GeometryEditor:
+    """
+    끌어서 옮기는 원자 편집. 결합 길이/각 값과 라벨 위치를 배열로 들고 있다가 원자 하나가 움직이면
+    그 원자가 들어 있는 결합과 각만 다시 계산한다. 원자별 결합/각 목록(incidence)은 분자마다 한 번
+    만들므로 이동 한 번의 비용은 이웃 수에만 비례한다. 각 순서는 get_bond_info와 같다.
+    """
+    def __init__(self, molecule, label_offset=0.5):
+        self.molecule = molecule
+        self.label_offset = label_offset
+        n = len(molecule.atoms)
+        self.bonds = molecule.bond_index
+        triples = [(a, atom.idx, b) for atom in molecule.atoms for a, b in combinations(list(atom.neighbors), 2)]
+        self.angles = np.array(triples, dtype=np.int64).reshape(-1, 3)
+        self.atom_bonds = incidence(n, self.bonds)
+        self.atom_angles = incidence(n, self.angles)
+        self.refresh()
+    def refresh(self):
+        """좌표가 통째로 바뀐 뒤(궤적, 최적화) 전체 값을 다시 계산"""
+        positions = self.molecule.positions
+        # 라벨을 바깥쪽으로 미는 기준점은 끄는 동안 고정해 다른 결합 라벨이 흔들리지 않게 한다
+        self.mid = positions.mean(axis=0) if len(positions) else np.zeros(3)
+        p1, p2 = positions[self.bonds[:, 0]], positions[self.bonds[:, 1]]
+        self.bond_centers = (p1 + p2) / 2
+        self.bond_lengths = np.linalg.norm(p1 - p2, axis=1)
+        self.bond_label_pos = get_bond_label_pos_perp(positions, self.bonds, self.label_offset, self.mid)
+        self.angle_label_pos, self.angle_values = angle_labels(positions, self.angles)
+    def touching(self, idx):
+        (bptr, brows), (aptr, arows) = self.atom_bonds, self.atom_angles
+        return brows[bptr[idx]:bptr[idx + 1]], arows[aptr[idx]:aptr[idx + 1]]
+    def move(self, idx, position):
+        """원자 idx를 옮기고 값이 바뀐 (결합 번호, 각 번호)를 돌려준다"""
+        positions = self.molecule.positions
+        positions[idx] = position
+        bond_ids, angle_ids = self.touching(idx)
+        if len(bond_ids):
+            pair = self.bonds[bond_ids]
+            p1, p2 = positions[pair[:, 0]], positions[pair[:, 1]]
+            self.bond_centers[bond_ids] = (p1 + p2) / 2
+            self.bond_lengths[bond_ids] = np.linalg.norm(p1 - p2, axis=1)
+            self.bond_label_pos[bond_ids] = get_bond_label_pos_perp(positions, pair, self.label_offset, self.mid)
+        if len(angle_ids):
+            self.angle_label_pos[angle_ids], self.angle_values[angle_ids] = angle_labels(positions, self.angles[angle_ids])
+        return bond_ids, angle_ids
+    def bond_info(self):
+        """get_bond_info와 같은 형태 (bonds, centers, lengths, angles)"""
+        return ([tuple(b) for b in self.bonds.tolist()], list(self.bond_centers), list(self.bond_lengths),
+                list(zip(self.angle_label_pos, self.angle_values)))
+
 
 def rotation_matrix(axis, theta):
     axis = axis / np.linalg.norm(axis)
@@ -571,137 +1592,150 @@ def rotation_matrix(axis, theta):
     ])
 
 
+def _ideal_polyhedra():
+    c, t = np.cos(2*np.pi/3), np.sin(2*np.pi/3)
+    ring = [[1, 0, 0], [c, t, 0], [c, -t, 0]]
+    tetra = np.array([[1, 1, 1], [1, -1, -1], [-1, 1, -1], [-1, -1, 1]]) / np.sqrt(3)
+    octa = [[1, 0, 0], [-1, 0, 0], [0, 1, 0], [0, -1, 0], [0, 0, 1], [0, 0, -1]]
+    # SN -> (단위 꼭짓점, 모서리)
+    return {
+        2: (np.array([[0, 0, 1], [0, 0, -1]], dtype=float), [(0, 1)]),
+        3: (np.array(ring, dtype=float), [(0, 1), (1, 2), (2, 0)]),
+        4: (tetra, [(0, 1), (0, 2), (0, 3), (1, 2), (2, 3), (3, 1)]),
+        5: (np.array([[0, 0, 1], [0, 0, -1]] + ring, dtype=float),
+            [(a, e) for a in (0, 1) for e in (2, 3, 4)] + [(2, 3), (3, 4), (4, 2)]),
+        6: (np.array(octa, dtype=float),
+            [(i, j) for i, j in combinations(range(6), 2) if j != i + 1 or i % 2]),
+    }
+
+SN_POLYHEDRA = _ideal_polyhedra()
+_ASSIGNMENTS = {}
+
+def _rotation_group(verts):
+    """정다면체를 자기 자신으로 옮기는 회전들을 꼭짓점 순열로 (det=+1만)"""
+    group = []
+    for perm in permutations(range(len(verts))):
+        h = verts.T @ verts[list(perm)]
+        u, _, vt = np.linalg.svd(h)
+        rot = vt.T @ np.diag([1, 1, np.sign(np.linalg.det(vt.T @ u.T))]) @ u.T
+        if np.allclose(verts @ rot.T, verts[list(perm)], atol=1e-6):
+            group.append(perm)
+    return np.array(group, dtype=np.int64)
+
+def _assignments(sn, m):
+    """
+    이웃 m개를 꼭짓점 sn개에 대응시키는 후보 (C, m).
+    회전으로 서로 겹치는 대응은 같은 결과를 주므로 회전군 궤도마다 하나만 남긴다.
+    """
+    key = (sn, m)
+    if key not in _ASSIGNMENTS:
+        group = _rotation_group(SN_POLYHEDRA[sn][0])
+        seen, cands = set(), []
+        for a in permutations(range(sn), m):
+            canon = min(tuple(g[list(a)]) for g in group)
+            if canon not in seen:
+                seen.add(canon)
+                cands.append(canon)
+        _ASSIGNMENTS[key] = np.array(cands, dtype=np.int64).reshape(-1, m)
+    return _ASSIGNMENTS[key]
+
+def fit_polyhedra(sn, centers, neighbors, radius=1.5):
+    """
+    중심 K개에 대해 이웃 방향에 가장 잘 맞는 정다면체(SN 2~6) 꼭짓점을 한 번에 계산.
+    centers: (K,3), neighbors: (K,m,3) 이웃 좌표 (m > sn이면 앞의 sn개만 사용)
+    각 후보 대응마다 Kabsch(SVD)로 회전을 구하고, 잔차가 가장 작은 대응을 고른다.
+    꼭짓점까지 거리는 평균 결합 길이(이웃이 없으면 radius). 반환: (K, sn, 3)
+    """
+    ideal = SN_POLYHEDRA[sn][0]
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    k = len(centers)
+    neighbors = np.asarray(neighbors, dtype=float).reshape(k, -1, 3)[:, :sn]
+    m = neighbors.shape[1]
+    if m == 0:
+        return centers[:, None, :] + radius * ideal[None]
+    vecs = neighbors - centers[:, None, :]
+    dist = np.linalg.norm(vecs, axis=2)
+    dirs = vecs / (dist[..., None] + 1e-12)
+    cand = ideal[_assignments(sn, m)]                     # (C, m, 3)
+    h = np.einsum('cmi,kmj->kcij', cand, dirs)            # (K, C, 3, 3)
+    u, sv, vt = np.linalg.svd(h)
+    det = np.sign(np.linalg.det(vt.transpose(0, 1, 3, 2) @ u.transpose(0, 1, 3, 2)))
+    # 잔차 = 2m - 2(s1 + s2 + det*s3) 이므로 괄호 값이 가장 큰 후보가 최적
+    best = np.argmax(sv[..., 0] + sv[..., 1] + det * sv[..., 2], axis=1)
+    rows = np.arange(k)
+    u, vt, det = u[rows, best], vt[rows, best], det[rows, best]
+    fix = np.ones((k, 3))
+    fix[:, 2] = det
+    rot = vt.transpose(0, 2, 1) @ (fix[:, :, None] * u.transpose(0, 2, 1))
+    scale = dist.mean(axis=1)
+    return centers[:, None, :] + scale[:, None, None] * (ideal @ rot.transpose(0, 2, 1))
+
 def make_regular_triangle(center, bonded_atoms, radius=1.5):
     """
     center: 선택 원자 좌표 (np.array, shape=(3,))
     bonded_atoms: 선택 원자와 직접 결합(막대 연결)한 원자들의 좌표 리스트 (list of np.array, shape=(3,))
-    radius: 정삼각형의 외접원의 반지름
-    """
-    n = len(bonded_atoms)
-    verts = []
-    for i in range(min(n,3)):
-        verts.append(bonded_atoms[i] - center)
-    if n < 3:
-        if n == 0:
-            normal = np.array([0,0,1])
-            start = np.array([radius,0,0])
-        elif n == 1:
-            v = verts[0] / np.linalg.norm(verts[0])
-            normal = np.cross(v, [0,0,1])
-            if np.linalg.norm(normal) < 1e-4:
-                normal = np.cross(v, [0,1,0])
-            normal = normal / np.linalg.norm(normal)
-            start = v * radius
-        else:
-            v1 = verts[0] / np.linalg.norm(verts[0])
-            v2 = verts[1] / np.linalg.norm(verts[1])
-            normal = np.cross(v1, v2)
-            if np.linalg.norm(normal) < 1e-4:
-                normal = np.array([0,0,1])
-            normal = normal / np.linalg.norm(normal)
-            start = (v1 + v2) / 2 * radius
-        for i in range(3-n):
-            angle = 2*np.pi/3 * (i+1)
-            rot = rotation_matrix(normal, angle)
-            pt = np.dot(rot, start)
-            verts.append(pt)
-    verts = np.array(verts)
-    centroid = verts.mean(axis=0)
-    verts = verts - centroid + center
-    return verts
+    radius: 이웃이 없을 때 꼭짓점까지 거리
+    """
+    return fit_polyhedra(3, center, np.asarray(bonded_atoms, dtype=float).reshape(1, -1, 3), radius)[0]
 
 def make_regular_tetrahedron(center, neighbors, radius=1.5):
-    n = len(neighbors)
-    verts = []
-    if n == 2:
-        a, b = neighbors[0], neighbors[1]
-        edge = np.linalg.norm(a - b)
-        v0 = np.array([edge/2, 0, -edge/(2*np.sqrt(3))])
-        v1 = np.array([-edge/2, 0, -edge/(2*np.sqrt(3))])
-        h = edge * np.sqrt(2/3)
-        v2 = np.array([0, edge/2, h - edge/(2*np.sqrt(3))])
-        v3 = np.array([0, -edge/2, h - edge/(2*np.sqrt(3))])
-        base = np.array([v0, v1, v2, v3])
-        best_verts = None
-        min_error = float('inf')
-        for i, j in combinations(range(4), 2):
-            for perm in permutations([a, b]):
-                std_vec = base[j] - base[i]
-                tgt_vec = perm[1] - perm[0]
-                def rotation_matrix_from_vectors(vec1, vec2):
-                    a1 = vec1 / np.linalg.norm(vec1)
-                    b1 = vec2 / np.linalg.norm(vec2)
-                    v = np.cross(a1, b1)
-                    c = np.dot(a1, b1)
-                    if np.linalg.norm(v) < 1e-8:
-                        return np.eye(3)
-                    s = np.linalg.norm(v)
-                    kmat = np.array([[0, -v[2], v[1]],
-                                    [v[2], 0, -v[0]],
-                                    [-v[1], v[0], 0]])
-                    return np.eye(3) + kmat + kmat @ kmat * ((1 - c) / (s ** 2))
-                R = rotation_matrix_from_vectors(std_vec, tgt_vec)
-                base_shifted = base - base[i]
-                base_rot = (R @ base_shifted.T).T + perm[0]
-                centroid = base_rot.mean(axis=0)
-                verts = base_rot - centroid + center
-                error = np.linalg.norm(verts[i] - perm[0]) + np.linalg.norm(verts[j] - perm[1])
-                if error < min_error:
-                    min_error = error
-                    best_verts = verts.copy()
-        return best_verts
-    elif n == 3:
-        verts = []
-        for i in range(3):
-            verts.append(neighbors[i] - center)
-        verts = np.array(verts)
-        verts = np.vstack([verts, np.array([0,0,-radius])])
-        centroid = verts.mean(axis=0)
-        verts = verts - centroid + center
-        if verts.shape[0] == 4:
-            p1, p2, p3 = verts[:3]
-            face_center = (p1 + p2 + p3) / 3
-            normal = np.cross(p2-p1, p3-p1)
-            normal = normal / np.linalg.norm(normal)
-            v = face_center - center
-            v_len = np.linalg.norm(v)
-            verts[3] = face_center - normal * v_len * 3
-            centroid = verts.mean(axis=0)
-            verts = verts - centroid + center
-        return verts
-    elif n == 4:
-        verts = [neighbors[i] - center for i in range(4)]
-        verts = np.array(verts)
-        centroid = verts.mean(axis=0)
-        verts = verts - centroid + center
-        return verts
-    else:
-        base = np.array([
-            [1, 1, 1],
-            [1, -1, -1],
-            [-1, 1, -1],
-            [-1, -1, 1]
-        ]) * (radius / np.sqrt(3))
-        verts = base[:max(1, n)]
-        verts = np.array([v for v in verts])
-        centroid = verts.mean(axis=0)
-        verts = verts - centroid + center
-        return verts
-    
+    return fit_polyhedra(4, center, np.asarray(neighbors, dtype=float).reshape(1, -1, 3), radius)[0]
+
+SN_COLORS = {2: '#FFB74D', 3: '#4DD0E1', 4: '#00C800', 5: '#BA68C8', 6: '#F06292'}
+
+def sn_polydata(shapes):
+    """
+    shapes: [(sn, verts (K,sn,3)), ...] 를 모서리 선분만 담은 PolyData 하나로 합친다.
+    점마다 SN 색(point_data 'rgb')을 넣어 액터 하나로 그린다.
+    """
+    points, lines, colors = [], [], []
+    n_points = 0
+    for sn, verts in shapes:
+        k = len(verts)
+        if k == 0:
+            continue
+        edges = np.array(SN_POLYHEDRA[sn][1], dtype=np.int64)
+        ids = (np.arange(k)[:, None, None] * sn + edges[None] + n_points).reshape(-1, 2)
+        lines.append(np.column_stack([np.full(len(ids), 2), ids]).ravel())
+        points.append(verts.reshape(-1, 3))
+        colors.append(np.repeat(hex_to_rgb([SN_COLORS[sn]]), k * sn, axis=0))
+        n_points += k * sn
+    if not points:
+        return None
+    mesh = pv.PolyData(np.concatenate(points), lines=np.concatenate(lines))
+    mesh.point_data['rgb'] = np.concatenate(colors)
+    return mesh
+
+def molecule_sn_shapes(molecule, offset=(0, 0, 0), atom_ids=None, radius=1.5):
+    """
+    중심 원자(결합수 2 이상, SN 2~6)마다 맞춘 다면체를 한 PolyData로.
+    (SN, 결합수)가 같은 원자끼리 묶어 fit_polyhedra를 한 번씩 호출한다.
+    """
+    v = molecule.vsepr
+    if v is None or len(molecule.bond_index) == 0:
+        return None
+    pos = molecule.positions + np.asarray(offset, dtype=float)
+    # 원자별 이웃을 CSR로: nbr[start[i]:start[i]+bond_count[i]]
+    pairs = np.concatenate([molecule.bond_index, molecule.bond_index[:, ::-1]])
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    nbr = pairs[:, 1]
+    start = np.concatenate([[0], np.cumsum(v['bond_count'])[:-1]])
+    ids = np.arange(len(pos)) if atom_ids is None else np.asarray(atom_ids, dtype=np.int64)
+    ids = ids[(v['bond_count'][ids] >= 2) & (v['SN'][ids] >= 2) & (v['SN'][ids] <= 6)]
+    shapes = []
+    for sn in range(2, 7):
+        for m in range(2, sn + 1):
+            group = ids[(v['SN'][ids] == sn) & (v['bond_count'][ids] == m)]
+            if len(group):
+                nb = pos[nbr[start[group][:, None] + np.arange(m)]]
+                shapes.append((sn, fit_polyhedra(sn, pos[group], nb, radius)))
+    return sn_polydata(shapes)
+
 def add_sn_shape(plotter, sn, center, neighbor_positions, radius=1.5):
-    color = '#00C800'
-    width = 3
-    if sn == 3:
-        verts = make_regular_triangle(center, neighbor_positions, radius)
-        edges = [(0,1), (1,2), (2,0)]
-    elif sn == 4:
-        verts = make_regular_tetrahedron(center, neighbor_positions, radius)
-        edges = [(0,1),(0,2),(0,3),(1,2),(2,3),(3,1)]
-    else:
+    if sn not in SN_POLYHEDRA:
         return
-    for i,j in edges:
-        line = pv.Line(verts[i], verts[j])
-        plotter.add_mesh(line, color=color, line_width=width)
+    verts = fit_polyhedra(sn, center, np.asarray(neighbor_positions, dtype=float).reshape(1, -1, 3), radius)
+    plotter.add_mesh(sn_polydata([(sn, verts)]), scalars='rgb', rgb=True, line_width=3, name='sn_shape')
 
 def get_periodic_table_positions():
     fr_radius = ELEMENT_PROPERTIES['Fr'][0]
@@ -721,22 +1755,116 @@ def get_periodic_table_positions():
                 positions[sym] = (col * spacing, -y, 0)
     return positions
 
-def get_bond_label_pos_perp(atom_positions, bonds, offset=0.5):
-    mid = np.mean(atom_positions, axis=0)
-    pos_list = []
-    for i, j in bonds:
-        p1, p2 = atom_positions[i], atom_positions[j]
-        center = (p1 + p2) / 2
-        bond_vec = (p2 - p1) / (np.linalg.norm(p2 - p1) + 1e-8)
-        to_mid = mid - center
-        perp = np.cross(bond_vec, to_mid)
-        if np.linalg.norm(perp) < 1e-6:
-            perp = np.cross(bond_vec, [1, 0, 0])
-            if np.linalg.norm(perp) < 1e-6:
-                perp = np.cross(bond_vec, [0, 1, 0])
-        perp = perp / (np.linalg.norm(perp) + 1e-8)
-        pos_list.append(center + perp * offset)
-    return pos_list
+def get_bond_label_pos_perp(atom_positions, bonds, offset=0.5, mid=None):
+    atom_positions = np.asarray(atom_positions, dtype=float).reshape(-1, 3)
+    bonds = np.asarray(bonds, dtype=np.int64).reshape(-1, 2)
+    if mid is None:
+        mid = atom_positions.mean(axis=0) if len(atom_positions) else np.zeros(3)
+    p1, p2 = atom_positions[bonds[:, 0]], atom_positions[bonds[:, 1]]
+    center = (p1 + p2) / 2
+    bond_vec = (p2 - p1) / (np.linalg.norm(p2 - p1, axis=1, keepdims=True) + 1e-8)
+    perp = np.cross(bond_vec, mid - center)
+    # 분자 중심 방향과 평행하면 x축, 그래도 평행하면 y축과의 외적을 쓴다
+    for axis in ([1, 0, 0], [0, 1, 0]):
+        flat = np.linalg.norm(perp, axis=1) < 1e-6
+        perp[flat] = np.cross(bond_vec[flat], axis)
+    perp /= np.linalg.norm(perp, axis=1, keepdims=True) + 1e-8
+    return center + perp * offset
+
+class LabelManager:
+    """
+    결합 길이/각 라벨 후보를 들고 있다가 카메라에 맞춰 보이는 것만 그린다.
+    시야 절두체 밖이나 너무 먼 라벨은 버리고, 화면을 cell_px 격자로 나눠 칸마다 가장 가까운
+    라벨 하나만 남긴 뒤 max_visible개로 자른다. 카메라가 바뀌면 update()만 다시 돈다.
+    """
+    def __init__(self, plotter, max_visible=200, cell_px=48, max_distance=3.0):
+        self.plotter = plotter
+        self.max_visible = max_visible
+        self.cell_px = cell_px
+        self.max_distance = max_distance
+        self.groups = {}
+        self.shown = {}
+        self.view_key = None
+    def _view(self):
+        cam = self.plotter.renderer.GetActiveCamera()
+        return (cam.GetPosition(), cam.GetFocalPoint(), cam.GetViewUp(), cam.GetViewAngle(),
+                cam.GetParallelScale(), tuple(self.plotter.renderer.GetSize()))
+    def view_changed(self):
+        # 렌더할 때마다 클리핑 범위가 바뀌어 카메라 ModifiedEvent가 나므로 시점이 실제로 바뀐 경우만 본다
+        return bool(self.groups) and self._view() != self.view_key
+    def set(self, name, positions, values, fmt, **style):
+        self.groups[name] = (np.asarray(positions, dtype=float).reshape(-1, 3), values, fmt, style)
+    def _remove(self, name):
+        # add_point_labels는 name-points/name-labels 두 액터를 만든다
+        self.plotter.remove_actor(f'{name}-points', reset_camera=False, render=False)
+        self.plotter.remove_actor(f'{name}-labels', reset_camera=False, render=False)
+    def clear(self):
+        for name in self.groups:
+            self._remove(name)
+        self.groups = {}
+        self.shown = {}
+    def move(self, name, ids, positions, values):
+        """
+        ids 라벨의 위치/값만 바꾼다. 컬링은 다시 하지 않고, 지금 보이는 라벨이 바뀌었으면
+        그 그룹 액터만 같은 라벨 집합으로 다시 만든다 (비용은 화면의 라벨 수 이하).
+        """
+        if name not in self.groups or len(ids) == 0:
+            return
+        pos, group_values, fmt, style = self.groups[name]
+        pos[ids] = positions
+        for i, value in zip(ids, values):
+            group_values[i] = value
+        shown = self.shown.get(name)
+        if shown is None or not np.isin(ids, shown).any():
+            return
+        self.plotter.add_point_labels(pos[shown], [fmt(group_values[i]) for i in shown], name=name,
+                                      reset_camera=False, render=False, **style)
+    def _screen(self, points):
+        renderer = self.plotter.renderer
+        w, h = renderer.GetSize()
+        cam = renderer.GetActiveCamera()
+        m = cam.GetCompositeProjectionTransformMatrix(w / max(h, 1), -1, 1)
+        mat = np.array([[m.GetElement(i, j) for j in range(4)] for i in range(4)])
+        clip = points @ mat[:3, :3].T + mat[:3, 3]
+        clip_w = points @ mat[3, :3] + mat[3, 3]
+        ndc = clip / np.where(np.abs(clip_w) < 1e-12, 1e-12, clip_w)[:, None]
+        inside = (clip_w > 0) & np.all(np.abs(ndc) <= 1, axis=1)
+        px = (ndc[:, :2] + 1) / 2 * (w, h)
+        dist = np.linalg.norm(points - np.array(cam.GetPosition()), axis=1)
+        focal = np.linalg.norm(np.array(cam.GetFocalPoint()) - np.array(cam.GetPosition()))
+        return px, dist, inside & (dist <= focal * self.max_distance)
+    def update(self, render=True):
+        if 0 in self.plotter.renderer.GetSize():
+            # 아직 창이 그려지지 않았으면 다음 카메라 변경 때 다시 시도
+            self.view_key = None
+            return
+        self.view_key = self._view()
+        names = [n for n, g in self.groups.items() if len(g[0])]
+        for name, group in self.groups.items():
+            if not len(group[0]):
+                self._remove(name)
+        if names:
+            points = np.concatenate([self.groups[n][0] for n in names])
+            owner = np.repeat(np.arange(len(names)), [len(self.groups[n][0]) for n in names])
+            local = np.concatenate([np.arange(len(self.groups[n][0])) for n in names])
+            px, dist, keep = self._screen(points)
+            cand = np.flatnonzero(keep)
+            cand = cand[np.argsort(dist[cand], kind='stable')]
+            # 격자 칸마다 카메라에 가장 가까운 라벨 하나
+            cells = np.floor(px[cand] / self.cell_px).astype(np.int64)
+            _, first = np.unique(cells[:, 0] * 1000003 + cells[:, 1], return_index=True)
+            chosen = cand[np.sort(first)][:self.max_visible]
+            for k, name in enumerate(names):
+                pos, values, fmt, style = self.groups[name]
+                ids = local[chosen[owner[chosen] == k]]
+                self.shown[name] = ids
+                if len(ids) == 0:
+                    self._remove(name)
+                    continue
+                self.plotter.add_point_labels(pos[ids], [fmt(values[i]) for i in ids], name=name,
+                                              reset_camera=False, render=False, **style)
+        if render:
+            self.plotter.render()
 
 def get_pretty_mol_name(iupac_name, synonyms, inp):
     for key in synonyms:
@@ -749,89 +1877,732 @@ def get_pretty_mol_name(iupac_name, synonyms, inp):
     return inp
 
 
+A0 = 0.529
+_RADIAL_COEFFS = {}
+_ANGULAR_COEFFS = {}
+
+def radial_coefficients(n, l):
+    """
+    R_nl(r) = norm * rho^l * exp(-rho/2) * L(rho), rho = 2r/(n a0) 의 (norm, L 계수 오름차순).
+    L은 일반화 라게르 다항식 L_{n-l-1}^{2l+1}. (n, l)마다 한 번만 계산한다
+    """
+    key = (n, l)
+    if key not in _RADIAL_COEFFS:
+        k, alpha = n - l - 1, 2 * l + 1
+        if k < 0:
+            raise ValueError(f"l은 n보다 작아야 합니다: n={n}, l={l}")
+        coeffs = np.array([(-1)**i * comb(k + alpha, k - i) / factorial(i) for i in range(k + 1)])
+        norm = np.sqrt((2 / n)**3 * factorial(k) / (2 * n * factorial(n + l)))
+        _RADIAL_COEFFS[key] = (norm, coeffs)
+    return _RADIAL_COEFFS[key]
+
+def angular_coefficients(l, m):
+    """
+    실수 구면조화 Y_lm = norm * Q(cos t) * sin^|m| t * (m >= 0: cos |m|p, m < 0: sin |m|p) 의 (norm, Q 계수 오름차순).
+    Q는 르장드르 다항식 P_l의 |m|계 도함수. 위상은 화학 관례대로 px 양의 로브가 +x를 향한다
+    """
+    key = (l, m)
+    if key not in _ANGULAR_COEFFS:
+        from numpy.polynomial import legendre, polynomial
+        am = abs(m)
+        if am > l:
+            raise ValueError(f"|m|은 l 이하여야 합니다: l={l}, m={m}")
+        q = polynomial.polyder(legendre.leg2poly([0] * l + [1]), am)
+        norm = np.sqrt((2 * l + 1) / (4 * np.pi) * factorial(l - am) / factorial(l + am))
+        _ANGULAR_COEFFS[key] = (norm * (np.sqrt(2) if m else 1), np.atleast_1d(q))
+    return _ANGULAR_COEFFS[key]
+
+def radial_wavefunction(n, l, r):
+    """수소 원자 동경함수 R_nl(r), r은 Å"""
+    from numpy.polynomial.polynomial import polyval
+    norm, coeffs = radial_coefficients(n, l)
+    rho = 2 * r / (n * A0)
+    return norm * rho**l * np.exp(-rho / 2) * polyval(rho, coeffs)
+
+def real_spherical_harmonic(l, m, ux, uy, uz):
+    """단위벡터 (ux, uy, uz) 방향의 실수 구면조화. sin^|m| t * e^(i|m|p) = (ux + i uy)^|m|"""
+    from numpy.polynomial.polynomial import polyval
+    norm, coeffs = angular_coefficients(l, m)
+    y = norm * polyval(uz, coeffs)
+    if m:
+        phase = (ux + 1j * uy)**abs(m)
+        y = y * (phase.real if m > 0 else phase.imag)
+    return y
+
+def hydrogen_wavefunction(n, l, m, X, Y, Z):
+    """
+    직교좌표(Å) 격자 위 수소 원자 실수 오비탈 psi_nlm. 특수함수 호출 없이
+    미리 구한 다항식 계수만으로 계산한다
+    """
+    r = np.sqrt(X**2 + Y**2 + Z**2)
+    inv_r = 1 / (r + 1e-10)
+    return radial_wavefunction(n, l, r) * real_spherical_harmonic(l, m, X * inv_r, Y * inv_r, Z * inv_r)
+
+def orbital_grid_range(n):
+    # 오비탈 크기는 n^2에 비례하므로 격자 범위도 같이 늘려 상대 해상도를 유지한다
+    return max(10.0, 2.5 * n * n)
+
+def valence_shell(atom_symbol, l):
+    """원자의 전자 배치(ELEMENT_PROPERTIES)에서 각운동량 l인 가장 바깥 껍질의 n. 없으면 None"""
+    letter = 'spdf'[l]
+    shells = [int(sh[:-1]) for sh in ELEMENT_PROPERTIES[atom_symbol][5] if sh.endswith(letter)]
+    return max(shells) if shells else None
+
 class HydrogenOrbital:
+    # d/f의 n은 최소값이며, 원소가 주어지면 그 원소의 원자가 껍질(3d, 4d, 4f, 5f ...)로 바뀐다
     ORBITAL_MAP = {
         's': (1, 0, 0),
+        '2s': (2, 0, 0),
         'pz': (2, 1, 0),
         'px': (2, 1, 1),
         'py': (2, 1, -1),
+        'dz2': (3, 2, 0),
+        'dxz': (3, 2, 1),
+        'dyz': (3, 2, -1),
+        'dx2-y2': (3, 2, 2),
+        'dxy': (3, 2, -2),
+        'fz3': (4, 3, 0),
+        'fxz2': (4, 3, 1),
+        'fyz2': (4, 3, -1),
+        'fz(x2-y2)': (4, 3, 2),
+        'fxyz': (4, 3, -2),
+        'fx(x2-3y2)': (4, 3, 3),
+        'fy(3x2-y2)': (4, 3, -3),
     }
-    def __init__(self, orb_type, HYDROGEN_ORBITAL_RADII, ELEMENT_ORBITAL_RADII, atom_symbol):
-        n, l, m = self.ORBITAL_MAP[orb_type]
+    @classmethod
+    def resolve(cls, orb_type, atom_symbol):
+        """격자를 만들지 않고 (n, l, m)만 정한다. 원소에 그 껍질이 없으면 ValueError"""
+        n, l, m = orb_type if isinstance(orb_type, tuple) else cls.ORBITAL_MAP[orb_type]
+        if atom_symbol and l >= 2 and not isinstance(orb_type, tuple):
+            n = valence_shell(atom_symbol, l)
+            if n is None:
+                raise ValueError(f"{atom_symbol}에는 {'spdf'[l]} 껍질이 없습니다")
+        return n, l, m
+    def __init__(self, orb_type, HYDROGEN_ORBITAL_RADII, ELEMENT_ORBITAL_RADII, atom_symbol, grid_size=50):
+        # orb_type은 ORBITAL_MAP 이름 또는 (n, l, m). grid_size는 축당 격자점 수
+        n, l, m = self.resolve(orb_type, atom_symbol)
         self.n = n
         self.l = l
         self.m = m
-        self.grid_size = 50
-        self.grid_range = 10.0
-        self.x = np.linspace(-self.grid_range, self.grid_range, self.grid_size)
-        self.y = np.linspace(-self.grid_range, self.grid_range, self.grid_size)
-        self.z = np.linspace(-self.grid_range, self.grid_range, self.grid_size)
-        self.X, self.Y, self.Z = np.meshgrid(self.x, self.y, self.z, indexing='ij')
-        self.R = np.sqrt(self.X**2 + self.Y**2 + self.Z**2)
-        self.PHI = np.arctan2(self.Y, self.X)
-        self.THETA = np.arccos(np.clip(self.Z / (self.R + 1e-10), -1, 1))
-        self.hydrogen_r = HYDROGEN_ORBITAL_RADII[orb_type]
-        self.element_r = ELEMENT_ORBITAL_RADII[atom_symbol][orb_type]
+        self.grid_size = grid_size
+        self.grid_range = orbital_grid_range(n)
+        self.X, self.Y, self.Z, self.R = orbital_grid(self.grid_size, self.grid_range)
+        # atom_symbol이 None이면 스케일하지 않은 수소 오비탈. d/f 반지름이 표에 없으면 원자 반지름을 쓴다
+        self.hydrogen_r = HYDROGEN_ORBITAL_RADII.get(orb_type, n * n * A0)
+        if not atom_symbol:
+            self.element_r = self.hydrogen_r
+        elif l >= 2:
+            self.element_r = ELEMENT_ORBITAL_RADII.get(atom_symbol, {}).get(orb_type, ELEMENT_PROPERTIES[atom_symbol][6])
+        else:
+            self.element_r = ELEMENT_ORBITAL_RADII[atom_symbol][orb_type]
         self.scale = self.element_r / self.hydrogen_r
+    @property
+    def quantum_numbers(self):
+        return (self.n, self.l, self.m)
     def radial_wavefunc(self, r):
-        a0 = 0.529 
-        r_bohr = r / a0
-        if self.n == 1 and self.l == 0:
-            return 2 * np.exp(-r_bohr)
-        elif self.n == 2 and self.l == 0:
-            return (1 - r_bohr/2) * np.exp(-r_bohr/2) / (2 * np.sqrt(2))
-        elif self.n == 2 and self.l == 1:
-            return r_bohr * np.exp(-r_bohr/2) / (2 * np.sqrt(6))
-        else:
-            return np.zeros_like(r)
+        return radial_wavefunction(self.n, self.l, r)
     def angular_wavefunc(self, theta, phi):
-        from scipy.special import sph_harm_y
-        if self.l == 0 and self.m == 0:
-            return sph_harm_y(0, 0, theta, phi).real
-        elif self.l == 1:
-            if self.m == 0:
-                return sph_harm_y(1, 0, theta, phi).real
-            elif self.m == 1:
-                return np.sqrt(2) * sph_harm_y(1, 1, theta, phi).real
-            elif self.m == -1:
-                return np.sqrt(2) * sph_harm_y(1, 1, theta, phi).imag
-        else:
-            return np.zeros_like(theta)
+        return real_spherical_harmonic(self.l, self.m, np.sin(theta) * np.cos(phi),
+                                       np.sin(theta) * np.sin(phi), np.cos(theta))
     def wavefunc(self):
-        R_part = self.radial_wavefunc(self.R)
-        Y_part = self.angular_wavefunc(self.THETA, self.PHI)
-        psi = R_part * Y_part
-        return psi
+        return hydrogen_wavefunction(self.n, self.l, self.m, self.X, self.Y, self.Z)
     def generate_isosurfaces(self):
-        psi = self.wavefunc()
-        psi_real = np.real(psi)
-        max_val = np.max(np.abs(psi_real))
-        outer_level = max_val
-        levels = []
-        levels.append(outer_level)
-        level = outer_level / 10
-        while level > 0.01 * outer_level:
-            levels.append(level)
-            level /= 10
-        import pyvista as pv
-        grid = pv.ImageData()
-        grid.dimensions = psi_real.shape
-        grid.origin = (-self.grid_range, -self.grid_range, -self.grid_range)
-        grid.spacing = (2*self.grid_range/(self.grid_size-1),) * 3
-        grid.point_data['psi'] = psi_real.flatten(order='F')
-        surfaces = []
-        for i, level in enumerate(levels):
-            for sign, color in [(1, 'red'), (-1, 'blue')]:
-                surf = grid.contour([sign*level])
-                if surf.n_points > 0:
-                    surf.points *= self.scale
-                    surfaces.append({
-                        'type': 'outer' if i == 0 else 'subshell',
-                        'surface': surf,
-                        'level': sign*level,
-                        'color': color
-                    })
-        return surfaces
+        return orbital_isosurfaces(self.wavefunc(), self.grid_range, self.scale)
+
+D_ORBITAL_LABELS = {'dz2': 'dz²', 'dxz': 'dxz', 'dyz': 'dyz', 'dx2-y2': 'dx²-y²', 'dxy': 'dxy'}
+F_ORBITAL_LABELS = {'fz3': 'fz³', 'fxz2': 'fxz²', 'fyz2': 'fyz²', 'fz(x2-y2)': 'fz(x²-y²)',
+                    'fxyz': 'fxyz', 'fx(x2-3y2)': 'fx(x²-3y²)', 'fy(3x2-y2)': 'fy(3x²-y²)'}
+
+_ORBITAL_GRIDS = {}
+_ORBITAL_FIELDS = {}
+_ORBITAL_SURFACES = {}
+
+def orbital_grid(grid_size=50, grid_range=10.0):
+    """모든 오비탈이 공유하는 격자 (X, Y, Z, R). 크기별로 한 번만 만든다"""
+    key = (grid_size, grid_range)
+    if key not in _ORBITAL_GRIDS:
+        x = np.linspace(-grid_range, grid_range, grid_size)
+        X, Y, Z = np.meshgrid(x, x, x, indexing='ij')
+        R = np.sqrt(X**2 + Y**2 + Z**2)
+        _ORBITAL_GRIDS[key] = (X, Y, Z, R)
+    return _ORBITAL_GRIDS[key]
+
+def orbital_isosurfaces(psi, grid_range, scale=1.0):
+    """
+    격자 위 파동함수의 +/- 등치면들. 가장 바깥 값부터 1/10씩 줄여 가며 만든다.
+    점 법선('Normals')도 여기서 한 번만 계산한다. 균일 스케일과 평행 이동은 법선 방향을 바꾸지 않으므로
+    캐시된 등치면을 복사해 배치할 때 그대로 쓸 수 있다.
+    """
+    psi_real = np.real(psi)
+    max_val = np.max(np.abs(psi_real))
+    outer_level = max_val
+    levels = []
+    levels.append(outer_level)
+    level = outer_level / 10
+    while level > 0.01 * outer_level:
+        levels.append(level)
+        level /= 10
+    grid_size = psi_real.shape[0]
+    grid = pv.ImageData()
+    grid.dimensions = psi_real.shape
+    grid.origin = (-grid_range, -grid_range, -grid_range)
+    grid.spacing = (2*grid_range/(grid_size-1),) * 3
+    grid.point_data['psi'] = psi_real.flatten(order='F')
+    surfaces = []
+    for i, level in enumerate(levels):
+        for sign, color in [(1, 'red'), (-1, 'blue')]:
+            surf = grid.contour([sign*level])
+            if surf.n_points > 0:
+                surf = surf.compute_normals(cell_normals=False, split_vertices=False)
+                surf.points *= scale
+                surfaces.append({
+                    'type': 'outer' if i == 0 else 'subshell',
+                    'surface': surf,
+                    'level': sign*level,
+                    'color': color
+                })
+    return surfaces
+
+def orbital_field(orb_type, grid_size=50):
+    """
+    공유 격자 위 (스케일 전) 수소 오비탈 파동함수. orb_type은 이름 또는 (n, l, m)이며
+    (n, l, m, grid_size)마다 한 번만 계산한다
+    """
+    ho = HydrogenOrbital(orb_type, HYDROGEN_ORBITAL_RADII, ELEMENT_ORBITAL_RADII, None, grid_size)
+    key = (ho.quantum_numbers, grid_size)
+    if key not in _ORBITAL_FIELDS:
+        _ORBITAL_FIELDS[key] = ho.wavefunc()
+    return _ORBITAL_FIELDS[key]
+
+def _scaled(surfaces, scale):
+    out = []
+    for surf in surfaces:
+        mesh = surf['surface'].copy()
+        mesh.points *= scale
+        out.append(dict(surf, surface=mesh))
+    return out
+
+def orbital_surfaces(orb_type, atom_symbol, grid_size=50):
+    """
+    원자 오비탈 등치면(원점 중심). 등치면은 (n, l, m, grid_size)마다 한 번만 만들고 원소 크기로 스케일만 한다.
+    원소에 없는 오비탈이면 KeyError(반지름 없음) 또는 ValueError(껍질 없음)
+    """
+    ho = HydrogenOrbital(orb_type, HYDROGEN_ORBITAL_RADII, ELEMENT_ORBITAL_RADII, atom_symbol, grid_size)
+    key = (ho.quantum_numbers, grid_size)
+    if key not in _ORBITAL_SURFACES:
+        _ORBITAL_SURFACES[key] = orbital_isosurfaces(orbital_field(ho.quantum_numbers, grid_size), ho.grid_range)
+    return _scaled(_ORBITAL_SURFACES[key], ho.scale)
+
+def hybrid_lobe(hybrid, grid_size=50):
+    """
+    +z를 향한 sp^n 혼성 오비탈 하나의 등치면 (n = 1, 2, 3).
+    psi = (-2s + sqrt(n) 2pz) / sqrt(1 + n). 2s 동경함수는 원자가 영역에서 음수라서
+    부호를 뒤집어야 큰 로브가 +z를 향한다.
+    """
+    key = ('hybrid', hybrid, grid_size)
+    if key not in _ORBITAL_SURFACES:
+        n = HYBRIDS.index(hybrid)
+        psi = (-orbital_field('2s', grid_size) + np.sqrt(n) * orbital_field('pz', grid_size)) / np.sqrt(1 + n)
+        _ORBITAL_SURFACES[key] = orbital_isosurfaces(psi, 10.0)
+    return _ORBITAL_SURFACES[key]
+
+def hybrid_directions(molecule, idx):
+    """
+    원자 idx의 혼성 오비탈 방향 (SN, 3) 단위벡터. 앞쪽은 실제 결합 방향,
+    나머지(비공유전자쌍)는 결합에 맞춘 정다면체(fit_polyhedra)에서 남는 꼭짓점 방향.
+    """
+    v = molecule.vsepr
+    sn = int(v['SN'][idx])
+    center = molecule.positions[idx]
+    nbrs = sorted(molecule.atoms[idx].neighbors)
+    bonds = molecule.positions[nbrs] - center
+    bonds = bonds / (np.linalg.norm(bonds, axis=1, keepdims=True) + 1e-12)
+    if len(bonds) >= sn:
+        return bonds[:sn]
+    verts = fit_polyhedra(sn, center, molecule.positions[nbrs].reshape(1, -1, 3))[0] - center
+    verts = verts / (np.linalg.norm(verts, axis=1, keepdims=True) + 1e-12)
+    free = list(range(sn))
+    for b in bonds:
+        free.remove(max(free, key=lambda j: verts[j] @ b))
+    return np.concatenate([bonds, verts[free]])
+
+def merge_surfaces(surfaces, rotations, translations):
+    """
+    원점 기준 등치면들을 (K,3,3) 회전과 (K,3) 이동으로 K번 배치해,
+    같은 (type, color)끼리 PolyData 하나로 합친다. 파동함수는 다시 계산하지 않는다.
+    """
+    groups = {}
+    for surf in surfaces:
+        mesh = surf['surface']
+        pts = np.asarray(mesh.points)
+        faces = mesh.faces.reshape(-1, 4)
+        placed = pts[None] @ rotations.transpose(0, 2, 1) + translations[:, None, :]
+        groups.setdefault((surf['type'], surf['color']), []).append((placed, faces))
+    out = []
+    for (kind, color), parts in groups.items():
+        points, faces, n = [], [], 0
+        for placed, f in parts:
+            for block in placed:
+                cells = f.copy()
+                cells[:, 1:] += n
+                points.append(block)
+                faces.append(cells)
+                n += len(block)
+        out.append({'type': kind, 'color': color,
+                    'surface': pv.PolyData(np.concatenate(points), np.concatenate(faces).ravel())})
+    return out
+
+def hybrid_orbital_meshes(molecule, idx, offset=(0, 0, 0), grid_size=50):
+    """원자 idx의 혼성 오비탈 로브 전체. 혼성이 없거나 원소의 p 반지름을 모르면 빈 리스트"""
+    v = molecule.vsepr
+    if v is None or v['hybrid'][idx] == 0:
+        return []
+    symbol = molecule.atoms[idx].symbol
+    radius = ELEMENT_ORBITAL_RADII.get(symbol, {}).get('pz')
+    if radius is None:
+        return []
+    surfaces = _scaled(hybrid_lobe(HYBRIDS[v['hybrid'][idx]], grid_size), radius / HYDROGEN_ORBITAL_RADII['pz'])
+    dirs = hybrid_directions(molecule, idx)
+    center = molecule.positions[idx] + np.asarray(offset, dtype=float)
+    return merge_surfaces(surfaces, rotation_from_z(dirs), np.repeat(center[None], len(dirs), axis=0))
+
+class RedrawScheduler(QObject):
+    """
+    같은 이벤트 루프 틱 안의 다시 그리기 요청을 모아 한 번만 처리한다.
+    request(layer)는 층을 dirty로 표시하고 0ms 단발 타이머를 건다. 'scene'은 전체 재구성이라
+    다른 층을 모두 포함한다. handlers: {층 이름: 호출할 함수}
+    """
+    def __init__(self, handlers, parent=None):
+        super().__init__(parent)
+        self.handlers = handlers
+        self.dirty = set()
+        self.requests = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+    def request(self, layer='scene'):
+        self.dirty.add(layer)
+        self.requests += 1
+        if not self.timer.isActive():
+            self.timer.start()
+    def mark_clean(self):
+        # 전체 재구성을 방금 직접 했으면 대기 중인 요청은 필요 없다
+        self.dirty.clear()
+        self.requests = 0
+        self.timer.stop()
+    def flush(self):
+        layers, requests = self.dirty, self.requests
+        self.dirty, self.requests = set(), 0
+        if not layers:
+            return
+        TRACER.count('redraw_scheduler', requests=requests)
+        if 'scene' in layers:
+            self.handlers['scene']()
+            return
+        for layer in layers:
+            self.handlers[layer]()
+
+# 미리보기 격자. 전체 해상도(50)보다 훨씬 빨라 선택 직후 바로 보여 줄 수 있다
+ORBITAL_PREVIEW_GRID = 20
+ORBITAL_FULL_GRID = 50
+
+def atom_orbital_surfaces(atom_symbol, center, orbitals, molecule=None, idx=None, offset=(0, 0, 0),
+                          grid_size=ORBITAL_FULL_GRID, cancelled=None):
+    """
+    원자 하나의 오비탈 등치면(월드 좌표)과 오류 메시지 목록.
+    cancelled()가 True가 되면 남은 오비탈은 만들지 않고 멈춘다
+    """
+    surfaces, errors = [], []
+    center = np.asarray(center, dtype=float)
+    for orb_type in orbitals:
+        if cancelled is not None and cancelled():
+            break
+        if orb_type == 'hybrid':
+            if molecule is not None:
+                surfaces += hybrid_orbital_meshes(molecule, idx, offset, grid_size)
+        elif orb_type == 'ppi':
+            if molecule is not None and 'pz' in ELEMENT_ORBITAL_RADII.get(atom_symbol, {}):
+                surfaces += merge_surfaces(orbital_surfaces('pz', atom_symbol, grid_size),
+                                           rotation_from_z(pi_normals(molecule, [idx])), center[None])
+        else:
+            try:
+                placed = orbital_surfaces(orb_type, atom_symbol, grid_size)
+            except Exception as e:
+                errors.append(f"오비탈 생성 오류: {e}")
+                continue
+            for surf in placed:
+                surf['surface'].points += center
+            surfaces += placed
+    return surfaces, errors
+
+def orbital_cache_ready(atom_symbol, orbitals, molecule=None, idx=None, grid_size=ORBITAL_FULL_GRID):
+    """
+    atom_orbital_surfaces가 파동함수/등치면을 새로 계산하지 않아도 되는지.
+    GUI 스레드에서 부르므로 격자는 만들지 않고 캐시 키만 확인한다
+    """
+    for orb_type in orbitals:
+        if orb_type == 'hybrid':
+            if molecule is None or molecule.vsepr['hybrid'][idx] == 0:
+                continue
+            key = ('hybrid', HYBRIDS[molecule.vsepr['hybrid'][idx]], grid_size)
+        else:
+            name = 'pz' if orb_type == 'ppi' else orb_type
+            try:
+                n, l, m = HydrogenOrbital.resolve(name, atom_symbol)
+            except Exception:
+                continue
+            if atom_symbol and l < 2 and name not in ELEMENT_ORBITAL_RADII.get(atom_symbol, {}):
+                # 반지름이 없어 어차피 오류로 끝나는 오비탈
+                continue
+            key = ((n, l, m), grid_size)
+        if key not in _ORBITAL_SURFACES:
+            return False
+    return True
+
+class OrbitalJobs(QObject):
+    """
+    오비탈 등치면을 백그라운드 스레드 하나에서 만든다. 거친 격자 결과(preview)를 먼저,
+    전체 해상도 결과(full)를 나중에 ready 신호로 GUI 스레드에 넘긴다.
+    submit/cancel 때마다 job_id가 바뀌고, 이전 작업은 다음 확인 지점에서 멈추며 결과도 버려진다.
+    """
+    ready = pyqtSignal(int, str, object)
+    STAGES = (('preview', ORBITAL_PREVIEW_GRID), ('full', ORBITAL_FULL_GRID))
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.job_id = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+    def cancel(self):
+        self.job_id += 1
+    def submit(self, build):
+        """build(grid_size, cancelled) -> 결과. 단계마다 ready(job_id, stage, 결과)를 보낸다"""
+        self.job_id += 1
+        job = self.job_id
+        cancelled = lambda: job != self.job_id
+        def run():
+            for stage, grid_size in self.STAGES:
+                if cancelled():
+                    return
+                try:
+                    with TRACER.span('orbitals', stage=stage):
+                        result = build(grid_size, cancelled)
+                except Exception as e:
+                    # 예외도 GUI 스레드에서 보고하도록 결과로 넘긴다
+                    result = e
+                if cancelled():
+                    return
+                self.ready.emit(job, stage, result)
+        self._executor.submit(run)
+        return job
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+class FetchJobs(QObject):
+    """
+    PubChem 조회와 로컬 3D 임베딩처럼 오래 걸릴 수 있는 분자 불러오기를 백그라운드 스레드 하나에서 한다.
+    결과(또는 예외)는 ready(job_id, 결과)로 GUI 스레드에 넘긴다. 새 요청이나 cancel 뒤 끝난 작업의 결과는 버려진다.
+    """
+    ready = pyqtSignal(int, object)
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.job_id = 0
+        self._executor = ThreadPoolExecutor(max_workers=1)
+    def cancel(self):
+        self.job_id += 1
+    def submit(self, load):
+        job = self.job_id = self.job_id + 1
+        def run():
+            if job != self.job_id:
+                return
+            try:
+                result = load()
+            except Exception as e:
+                result = e
+            self.ready.emit(job, result)
+        self._executor.submit(run)
+        return job
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+ORBITAL_RGBA = {('outer', 'red'): (255, 51, 51, 178), ('outer', 'blue'): (25, 118, 210, 178),
+                ('subshell', 'red'): (255, 51, 51, 102), ('subshell', 'blue'): (25, 118, 210, 102)}
+
+def pi_systems(molecule):
+    """
+    sp/sp2 원자와 다중결합 원자를 π 원자로 보고, π 원자끼리 결합으로 이어진 덩어리 번호.
+    π 원자가 아니면 -1
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    n = len(molecule.positions)
+    v = molecule.vsepr
+    is_pi = (v['hybrid'] == 1) | (v['hybrid'] == 2)
+    multiple = molecule.bond_index[molecule.bond_orders >= 2]
+    is_pi[multiple.ravel()] = True
+    b = molecule.bond_index[is_pi[molecule.bond_index].all(axis=1)]
+    graph = coo_matrix((np.ones(len(b)), (b[:, 0], b[:, 1])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    return np.where(is_pi, labels, -1)
+
+def pi_normals(molecule, ids):
+    """
+    원자마다 결합 평면의 법선(p⊥ 방향) (K,3). 이웃이 하나뿐이면 그 이웃의 평면을 쓰고,
+    평면을 정할 수 없으면 +z. 부호는 전체 평균 쪽으로 맞춰 로브 위상을 통일한다.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    pos = molecule.positions
+    def plane_normal(i):
+        nbrs = sorted(molecule.atoms[i].neighbors)
+        if len(nbrs) < 2:
+            return None
+        # 결합 벡터들이 가장 적게 퍼진 방향 = 중심 원자를 지나는 평면의 법선
+        return np.linalg.svd(pos[nbrs] - pos[i])[2][-1]
+    normals = np.tile([0.0, 0.0, 1.0], (len(ids), 1))
+    for k, i in enumerate(ids.tolist()):
+        normal = plane_normal(i)
+        if normal is None and len(molecule.atoms[i].neighbors) == 1:
+            normal = plane_normal(next(iter(molecule.atoms[i].neighbors)))
+        if normal is not None and np.linalg.norm(normal) > 1e-6:
+            normals[k] = normal / np.linalg.norm(normal)
+    ref = normals.sum(axis=0)
+    if np.linalg.norm(ref) < 1e-6:
+        ref = normals[0]
+    normals[normals @ ref < 0] *= -1
+    return normals
+
+def orbital_polydata(parts):
+    """
+    parts: [(surfaces, rotations (K,3,3), translations (K,3)), ...] 를 점마다 RGBA를 가진
+    PolyData 하나로. 템플릿 등치면(과 법선)을 인스턴스마다 변환해 이어 붙일 뿐
+    파동함수나 법선은 다시 계산하지 않는다.
+    """
+    points, normals, faces, rgba, n = [], [], [], [], 0
+    for surfaces, rotations, translations in parts:
+        if len(rotations) == 0:
+            continue
+        for surf in surfaces:
+            mesh = surf['surface']
+            base = np.asarray(mesh.points)
+            tris = mesh.faces.reshape(-1, 4)[:, 1:]
+            k, m = len(rotations), len(base)
+            points.append((base[None] @ rotations.transpose(0, 2, 1) + translations[:, None, :]).reshape(-1, 3))
+            normals.append((mesh.point_data['Normals'][None] @ rotations.transpose(0, 2, 1)).reshape(-1, 3))
+            faces.append((tris[None] + (n + np.arange(k) * m)[:, None, None]).reshape(-1, 3))
+            rgba.append(np.tile(np.array(ORBITAL_RGBA[surf['type'], surf['color']], dtype=np.uint8), (k * m, 1)))
+            n += k * m
+    if not points:
+        return None
+    mesh = pv.PolyData.from_regular_faces(np.concatenate(points), np.concatenate(faces))
+    mesh.point_data['Normals'] = np.concatenate(normals)
+    mesh.point_data.active_normals_name = 'Normals'
+    mesh.point_data['rgba'] = np.concatenate(rgba)
+    return mesh
+
+def orbital_batch(molecule, ids, orb_types, offset=(0, 0, 0)):
+    """
+    원자 집합 ids에 같은 오비탈(orb_types: HydrogenOrbital.ORBITAL_MAP 이름, 'ppi', 'hybrid')을 한꺼번에.
+    템플릿은 원소(혼성은 원소+혼성)마다 한 번만 만들고 원자마다 회전/이동만 해 액터 하나로 합친다.
+    'ppi'는 결합 평면에 수직인 p 오비탈.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if len(ids) == 0:
+        return None
+    centers = molecule.positions[ids] + np.asarray(offset, dtype=float)
+    symbols = np.array([molecule.atoms[i].symbol for i in ids.tolist()])
+    normals = pi_normals(molecule, ids) if 'ppi' in orb_types else None
+    parts = []
+    for sym in np.unique(symbols).tolist():
+        sel = np.flatnonzero(symbols == sym)
+        radii = ELEMENT_ORBITAL_RADII.get(sym, {})
+        eye = np.repeat(np.eye(3)[None], len(sel), axis=0)
+        for orb_type in orb_types:
+            if orb_type in HydrogenOrbital.ORBITAL_MAP:
+                try:
+                    parts.append((orbital_surfaces(orb_type, sym), eye, centers[sel]))
+                except (KeyError, ValueError):
+                    # 그 원소에 없는 오비탈은 건너뛴다
+                    continue
+            elif orb_type == 'ppi' and 'pz' in radii:
+                parts.append((orbital_surfaces('pz', sym), rotation_from_z(normals[sel]), centers[sel]))
+            elif orb_type == 'hybrid' and 'pz' in radii:
+                hybrid = molecule.vsepr['hybrid'][ids[sel]]
+                for h in np.unique(hybrid[hybrid > 0]).tolist():
+                    atoms = ids[sel][hybrid == h]
+                    dirs = np.concatenate([hybrid_directions(molecule, i) for i in atoms.tolist()])
+                    surfaces = _scaled(hybrid_lobe(HYBRIDS[h]), radii['pz'] / HYDROGEN_ORBITAL_RADII['pz'])
+                    parts.append((surfaces, rotation_from_z(dirs),
+                                  np.repeat(molecule.positions[atoms] + offset, h + 1, axis=0)))
+    return orbital_polydata(parts)
+
+class ElectronCloudSampler:
+    """
+    |psi_nlm|^2 분포에서 점을 뽑는 샘플러 (스케일 전 수소 오비탈, Å).
+    반지름은 r^2 R^2의 누적분포를 역변환해서, 방향은 구면 위 균일 분포에서 |Y|^2로 기각해서 뽑는다.
+    """
+    def __init__(self, n, l, m, seed=None):
+        self.n, self.l, self.m = n, l, m
+        self.rng = np.random.default_rng(seed)
+        # 3n^2 + 10 보어 밖의 확률은 무시할 만큼 작다
+        self.r_grid = np.linspace(0, (3 * n * n + 10) * A0, 4096)
+        pdf = (self.r_grid * radial_wavefunction(n, l, self.r_grid))**2
+        cdf = np.concatenate([[0], np.cumsum((pdf[1:] + pdf[:-1]) / 2)])
+        self.cdf = cdf / cdf[-1]
+        ct, ph = np.meshgrid(np.linspace(-1, 1, 181), np.linspace(0, 2 * np.pi, 361))
+        st = np.sqrt(1 - ct**2)
+        y2 = real_spherical_harmonic(l, m, st * np.cos(ph), st * np.sin(ph), ct)**2
+        self.y2_max = y2.max() * 1.05
+        self.acceptance = max(y2.mean() / self.y2_max, 1e-3)
+    def _directions(self, count):
+        out, filled = np.empty((count, 3)), 0
+        while filled < count:
+            k = int((count - filled) / self.acceptance * 1.2) + 16
+            ct = self.rng.uniform(-1, 1, k)
+            ph = self.rng.uniform(0, 2 * np.pi, k)
+            st = np.sqrt(1 - ct**2)
+            d = np.column_stack([st * np.cos(ph), st * np.sin(ph), ct])
+            keep = d[self.rng.random(k) * self.y2_max < real_spherical_harmonic(self.l, self.m, *d.T)**2]
+            take = min(len(keep), count - filled)
+            out[filled:filled + take] = keep[:take]
+            filled += take
+        return out
+    def sample(self, count):
+        """(count,3) 좌표와 파동함수 부호(+1/-1)"""
+        r = np.interp(self.rng.random(count), self.cdf, self.r_grid)
+        d = self._directions(count)
+        sign = np.sign(radial_wavefunction(self.n, self.l, r) * real_spherical_harmonic(self.l, self.m, *d.T))
+        return d * r[:, None], sign
+
+_CLOUD_SAMPLERS = {}
+
+def cloud_sampler(quantum_numbers):
+    if quantum_numbers not in _CLOUD_SAMPLERS:
+        _CLOUD_SAMPLERS[quantum_numbers] = ElectronCloudSampler(*quantum_numbers)
+    return _CLOUD_SAMPLERS[quantum_numbers]
+
+def orbital_placements(symbols, centers, orb_types, normals=None):
+    """
+    원소·오비탈마다 [(HydrogenOrbital, 중심 (K,3), 회전 (K,3,3) 또는 None)].
+    'ppi'는 normals 방향으로 돌린 pz. 원소에 없는 오비탈과 혼성은 건너뛴다
+    """
+    symbols = np.asarray(symbols)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    placements = []
+    for sym in np.unique(symbols).tolist():
+        sel = np.flatnonzero(symbols == sym)
+        for orb_type in orb_types:
+            name, rot = orb_type, None
+            if orb_type == 'ppi' and normals is not None:
+                name, rot = 'pz', rotation_from_z(normals[sel])
+            if name not in HydrogenOrbital.ORBITAL_MAP:
+                continue
+            try:
+                ho = HydrogenOrbital(name, HYDROGEN_ORBITAL_RADII, ELEMENT_ORBITAL_RADII, sym)
+            except (KeyError, ValueError):
+                continue
+            placements.append((ho, centers[sel], rot))
+    return placements
+
+def cloud_sources(symbols, centers, orb_types, normals=None):
+    """점 구름 원천 목록 [(샘플러, 스케일, 중심 (K,3), 회전 (K,3,3) 또는 None)]"""
+    return [(cloud_sampler(ho.quantum_numbers), ho.scale, c, rot)
+            for ho, c, rot in orbital_placements(symbols, centers, orb_types, normals)]
+
+CLOUD_RGB = {1: (255, 51, 51), -1: (25, 118, 210)}
+# 점 수 예산 -> 점 크기(px). 점이 많을수록 작게 그린다
+CLOUD_BUDGETS = {5000: 5, 20000: 4, 100000: 3, 500000: 2}
+
+class ElectronCloud:
+    """
+    여러 원천의 점 구름을 점 스프라이트 PolyData 하나로. step()마다 batch개씩 늘리고
+    budget에 도달하면 멈춘다. 카메라를 돌리는 동안에도 타이머로 조금씩 채울 수 있다.
+    """
+    def __init__(self, sources, budget=20000, batch=None):
+        self.sources = sources
+        self.budget = budget
+        self.batch = batch or max(budget // 8, 2000)
+        self.n_instances = sum(len(c) for _, _, c, _ in sources)
+        self.points, self.colors = [], []
+        self.count = 0
+        self.mesh = pv.PolyData(np.zeros((1, 3)))
+        self.mesh.point_data['rgb'] = np.zeros((1, 3), dtype=np.uint8)
+    @property
+    def done(self):
+        return self.n_instances == 0 or self.count >= self.budget
+    def step(self):
+        """한 배치를 더 뽑아 메시를 제자리에서 갱신. 더 채울 것이 남았으면 True"""
+        if self.done:
+            return False
+        m = max(1, min(self.batch, self.budget - self.count) // self.n_instances)
+        for sampler, scale, centers, rot in self.sources:
+            pts, sign = sampler.sample(m)
+            pts = pts * scale
+            placed = pts[None] @ rot.transpose(0, 2, 1) if rot is not None else np.broadcast_to(pts, (len(centers),) + pts.shape)
+            self.points.append((placed + centers[:, None, :]).reshape(-1, 3))
+            rgb = np.where(sign[:, None] > 0, CLOUD_RGB[1], CLOUD_RGB[-1]).astype(np.uint8)
+            self.colors.append(np.tile(rgb, (len(centers), 1)))
+            self.count += len(centers) * m
+        cloud = pv.PolyData(np.concatenate(self.points))
+        cloud.point_data['rgb'] = np.concatenate(self.colors)
+        self.mesh.shallow_copy(cloud)
+        return not self.done
+
+_ORBITAL_EXTENTS = {}
+
+def orbital_extent(quantum_numbers, cutoff=0.01):
+    """|psi|가 최대값의 cutoff 이상인 영역의 반지름 (스케일 전, Å)"""
+    key = (quantum_numbers, cutoff)
+    if key not in _ORBITAL_EXTENTS:
+        psi = orbital_field(quantum_numbers)
+        R = orbital_grid(50, orbital_grid_range(quantum_numbers[0]))[3]
+        _ORBITAL_EXTENTS[key] = float(R[np.abs(psi) >= cutoff * np.abs(psi).max()].max())
+    return _ORBITAL_EXTENTS[key]
+
+def orbital_volume(placements, max_voxels=128**3):
+    """
+    배치된 오비탈들을 부호 있는 정규화 파동함수(-1~1) 격자 하나로 다시 샘플링한 pv.ImageData.
+    원자마다 캐시된 장을 (회전, 스케일 역변환 후) 선형 보간하고, 겹치는 곳은 절댓값이 큰 쪽을 쓴다.
+    """
+    from scipy.ndimage import map_coordinates
+    if not placements:
+        return None
+    lo, hi, spacing = np.full(3, np.inf), np.full(3, -np.inf), np.inf
+    for ho, centers, _ in placements:
+        ext = orbital_extent(ho.quantum_numbers) * ho.scale
+        lo = np.minimum(lo, centers.min(axis=0) - ext)
+        hi = np.maximum(hi, centers.max(axis=0) + ext)
+        spacing = min(spacing, 2 * ho.grid_range / (ho.grid_size - 1) * ho.scale)
+    spacing = max(spacing, (np.prod(hi - lo) / max_voxels) ** (1 / 3))
+    dims = np.ceil((hi - lo) / spacing).astype(int) + 1
+    values = np.zeros(dims)
+    for ho, centers, rotations in placements:
+        psi = orbital_field(ho.quantum_numbers)
+        psi = psi / np.abs(psi).max()
+        ext = orbital_extent(ho.quantum_numbers) * ho.scale
+        step = 2 * ho.grid_range / (ho.grid_size - 1)
+        for k, c in enumerate(centers):
+            i0 = np.maximum(np.floor((c - ext - lo) / spacing).astype(int), 0)
+            i1 = np.minimum(np.ceil((c + ext - lo) / spacing).astype(int) + 1, dims)
+            axes = [lo[a] + spacing * np.arange(i0[a], i1[a]) - c[a] for a in range(3)]
+            local = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1)
+            if rotations is not None:
+                local = local @ rotations[k]
+            idx = (local / ho.scale + ho.grid_range) / step
+            v = map_coordinates(psi, idx.reshape(-1, 3).T, order=1, cval=0.0).reshape(local.shape[:3])
+            box = values[i0[0]:i1[0], i0[1]:i1[1], i0[2]:i1[2]]
+            np.copyto(box, v, where=np.abs(v) > np.abs(box))
+    grid = pv.ImageData(dimensions=dims, spacing=(spacing,) * 3, origin=lo)
+    grid.point_data['psi'] = values.ravel(order='F')
+    return grid
+
+def orbital_volume_lut():
+    """부호 있는 전달함수: 양수 빨강, 음수 파랑, 불투명도는 |psi|에 따라 증가 (0 근처는 투명)"""
+    v = np.linspace(-1, 1, 256)
+    rgba = np.zeros((256, 4))
+    rgba[:, :3] = np.where(v[:, None] > 0, (255, 51, 51), (25, 118, 210))
+    rgba[:, 3] = 255 * 0.6 * np.clip((np.abs(v) - 0.02) / 0.5, 0, 1) ** 1.5
+    return pv.LookupTable(values=rgba.astype(np.uint8), scalar_range=(-1, 1))
 
 def get_lone_pair_count(element_property_value, bond_count):
     v = element_property_value
@@ -863,6 +2634,49 @@ def get_lone_pair_count(element_property_value, bond_count):
             return 0
     return 0
 
+# (족, 결합수) -> 비공유전자쌍 수. 결합수는 MAX_VSEPR_BONDS에서 자른다
+MAX_VSEPR_BONDS = 8
+LONE_PAIR_TABLE = np.array([[get_lone_pair_count(g, b) for b in range(MAX_VSEPR_BONDS + 1)]
+                            for g in range(19)], dtype=np.int64)
+VSEPR_SHAPES = [None, '직선형', '평면삼각형', '굽은형1', '사면체형', '삼각뿔형', '굽은형2']
+HYBRIDS = [None, 'sp', 'sp2', 'sp3']
+HYBRID_COLORS = hex_to_rgb(['#546E7A', '#FF7043', '#66BB6A', '#42A5F5'])
+# (SN, 비공유전자쌍) -> (구조 코드, 혼성 코드)
+SHAPE_TABLE = np.zeros((MAX_VSEPR_BONDS + 4, 4), dtype=np.int64)
+HYBRID_TABLE = np.zeros((MAX_VSEPR_BONDS + 4, 4), dtype=np.int64)
+SHAPE_TABLE[2, :], HYBRID_TABLE[2, :] = 1, 1
+SHAPE_TABLE[3, 0], SHAPE_TABLE[3, 1], HYBRID_TABLE[3, :2] = 2, 3, 2
+SHAPE_TABLE[4, 0], SHAPE_TABLE[4, 1], SHAPE_TABLE[4, 2], HYBRID_TABLE[4, :3] = 4, 5, 6, 3
+
+def analyze_vsepr(molecule):
+    """
+    모든 원자의 결합수/비공유전자쌍/SN/구조/혼성을 표 조회로 한 번에 계산.
+    shape/hybrid는 VSEPR_SHAPES/HYBRIDS의 인덱스(0 = 해당 없음)
+    """
+    n = len(molecule.positions)
+    bond_count = np.bincount(molecule.bond_index.ravel(), minlength=n)[:n]
+    group = ELEMENT_TABLE['group'][molecule.numbers]
+    lone_pairs = LONE_PAIR_TABLE[group, np.minimum(bond_count, MAX_VSEPR_BONDS)]
+    sn = bond_count + lone_pairs
+    sn_idx = np.minimum(sn, len(SHAPE_TABLE) - 1)
+    return {'bond_count': bond_count, 'lone_pairs': lone_pairs, 'SN': sn,
+            'shape': SHAPE_TABLE[sn_idx, lone_pairs], 'hybrid': HYBRID_TABLE[sn_idx, lone_pairs]}
+
+def vsepr_info(molecule, idx):
+    """analyze_StericNumber가 쓰던 형식의 원자 하나 요약. 결합이 없으면 None"""
+    v = molecule.vsepr
+    if v is None or v['bond_count'][idx] == 0:
+        return None
+    return {
+        'atom_idx': idx,
+        'symbol': molecule.atoms[idx].symbol,
+        'bond_count': int(v['bond_count'][idx]),
+        'lone_pairs': int(v['lone_pairs'][idx]),
+        'SN': int(v['SN'][idx]),
+        'structure': VSEPR_SHAPES[v['shape'][idx]],
+        'hybrid': HYBRIDS[v['hybrid'][idx]],
+    }
+
 class MoleculeApp(QWidget):
     def __init__(self):
         super().__init__()
@@ -883,18 +2697,58 @@ class MoleculeApp(QWidget):
         right_panel.addWidget(self.output_box)
         self.mol_entry = QLineEdit()
         self.mol_entry.setFont(QFont("Arial", 14))
-        self.mol_entry.setPlaceholderText("분자식/SMILES/CID/분자명 또는 원소기호 여러 개(H Og Se U), All")
+        self.mol_entry.setPlaceholderText("분자식/SMILES/CID/분자명 또는 원소기호 여러 개(H Og Se U), All, SDF 파일(경로#번호)")
         self.gen_button = QPushButton("생성")
         self.gen_button.setFont(QFont("Arial", 14))
         self.gen_button.clicked.connect(self.generate_molecule)
         row = QHBoxLayout()
         row.addWidget(self.mol_entry)
         row.addWidget(self.gen_button)
+        self.relax_button = QPushButton("최적화")
+        self.relax_button.setFont(QFont("Arial", 14))
+        self.relax_button.clicked.connect(self.toggle_relaxation)
+        row.addWidget(self.relax_button)
         right_panel.addLayout(row)
+        lib_row = QHBoxLayout()
+        self.lib_prev_button = QPushButton("◀")
+        self.lib_next_button = QPushButton("▶")
+        self.lib_pos_label = QLabel()
+        self.lib_pos_label.setFont(QFont("Consolas", 12))
+        self.lib_traj_button = QPushButton("궤적")
+        self.lib_prev_button.clicked.connect(lambda: self.show_library_record(self.library_idx - 1))
+        self.lib_next_button.clicked.connect(lambda: self.show_library_record(self.library_idx + 1))
+        self.lib_traj_button.clicked.connect(self.open_library_trajectory)
+        for w in (self.lib_prev_button, self.lib_pos_label, self.lib_next_button, self.lib_traj_button):
+            w.hide()
+            lib_row.addWidget(w)
+        right_panel.addLayout(lib_row)
+        traj_row = QHBoxLayout()
+        self.play_button = QPushButton("재생")
+        self.play_button.clicked.connect(self.toggle_playback)
+        self.frame_slider = QSlider(Qt.Horizontal)
+        self.frame_slider.valueChanged.connect(self.set_frame)
+        self.frame_label = QLabel()
+        self.frame_label.setFont(QFont("Consolas", 12))
+        for w in (self.play_button, self.frame_slider, self.frame_label):
+            w.hide()
+            traj_row.addWidget(w)
+        right_panel.addLayout(traj_row)
+        self.play_timer = QTimer(self)
+        self.play_timer.setInterval(33)
+        self.play_timer.timeout.connect(self.advance_frame)
+        # 힘장 최적화 중간 좌표를 공유 메모리에서 받아 제자리 갱신
+        self.relaxation = None
+        self.relax_timer = QTimer(self)
+        self.relax_timer.setInterval(33)
+        self.relax_timer.timeout.connect(self._relax_step)
         self.checks = {}
-        for label, key in [('결합 길이','show_bond_length'), ('결합 각','show_bond_angle')]:
+        for label, key, default in [('결합 길이','show_bond_length',True), ('결합 각','show_bond_angle',True),
+                                    ('SN 전체','show_all_sn',False), ('혼성 색','color_by_hybrid',False),
+                                    ('접촉','show_contacts',False),
+                                    ('원자 표','show_atom_table',False), ('편집','edit_mode',False),
+                                    ('성능','show_trace',False)]:
             cb = QCheckBox(label)
-            cb.setChecked(True)
+            cb.setChecked(default)
             cb.setFont(QFont("Arial", 13))
             cb.stateChanged.connect(lambda s,k=key: self.toggle_option(k,s))
             right_panel.addWidget(cb)
@@ -908,8 +2762,7 @@ class MoleculeApp(QWidget):
         self.ao_checkbox.stateChanged.connect(self.ao_toggled)
         ao_row.addWidget(self.ao_checkbox)
         
-        self.atom_meshes    = []
-        self.bond_meshes    = []
+        self.meshes         = None
         self.atom_positions = None
         self.atom_symbols   = []
         self.bonds          = []
@@ -919,27 +2772,92 @@ class MoleculeApp(QWidget):
         self.s_checkbox.setChecked(False)
         self.s_checkbox.setFont(QFont("Arial", 12))
         self.s_checkbox.stateChanged.connect(self.update_ao_sub_visibility)
-        self.s_checkbox.stateChanged.connect(self.redraw)
+        self.s_checkbox.stateChanged.connect(self.schedule_redraw)
         self.s_checkbox.hide()
         self.p_checkbox = QCheckBox("p")
         self.p_checkbox.setChecked(False)
         self.p_checkbox.setFont(QFont("Arial", 12))
         self.p_checkbox.stateChanged.connect(self.update_ao_sub_visibility)
         self.p_checkbox.hide()
+        self.hybrid_checkbox = QCheckBox("혼성")
+        self.hybrid_checkbox.setChecked(False)
+        self.hybrid_checkbox.setFont(QFont("Arial", 12))
+        self.hybrid_checkbox.stateChanged.connect(self.schedule_redraw)
+        self.hybrid_checkbox.hide()
+        self.d_checkbox = QCheckBox("d")
+        self.f_checkbox = QCheckBox("f")
+        for cb in (self.d_checkbox, self.f_checkbox):
+            cb.setChecked(False)
+            cb.setFont(QFont("Arial", 12))
+            cb.stateChanged.connect(self.update_ao_sub_visibility)
+            cb.hide()
         ao_row.addWidget(self.s_checkbox)
         ao_row.addWidget(self.p_checkbox)
+        ao_row.addWidget(self.d_checkbox)
+        ao_row.addWidget(self.f_checkbox)
+        ao_row.addWidget(self.hybrid_checkbox)
         self.ao_main_layout.addLayout(ao_row)
         self.p_sub_layout = QHBoxLayout()
         self.px_checkbox = QCheckBox("px")
         self.py_checkbox = QCheckBox("py")
         self.pz_checkbox = QCheckBox("pz")
-        for cb in (self.px_checkbox, self.py_checkbox, self.pz_checkbox):
+        self.ppi_checkbox = QCheckBox("p⊥")
+        self.ppi_checkbox.setToolTip("결합 평면에 수직인 p 오비탈")
+        for cb in (self.px_checkbox, self.py_checkbox, self.pz_checkbox, self.ppi_checkbox):
             cb.setChecked(False)
             cb.setFont(QFont("Arial", 11))
-            cb.stateChanged.connect(self.redraw)
+            cb.stateChanged.connect(self.schedule_redraw)
             cb.hide()
             self.p_sub_layout.addWidget(cb)
         self.ao_main_layout.addLayout(self.p_sub_layout)
+        # d/f 세부 오비탈. 키는 HydrogenOrbital.ORBITAL_MAP 이름
+        self.sub_orbital_checks = {}
+        for parent, labels, per_row in ((self.d_checkbox, D_ORBITAL_LABELS, 5), (self.f_checkbox, F_ORBITAL_LABELS, 4)):
+            grid = QGridLayout()
+            for k, (name, label) in enumerate(labels.items()):
+                cb = QCheckBox(label)
+                cb.setChecked(False)
+                cb.setFont(QFont("Arial", 11))
+                cb.stateChanged.connect(self.schedule_redraw)
+                cb.hide()
+                grid.addWidget(cb, k // per_row, k % per_row)
+                self.sub_orbital_checks[name] = (parent, cb)
+            self.ao_main_layout.addLayout(grid)
+        # 오비탈을 그릴 원자 집합. 'single' 외에는 원소별 템플릿을 인스턴싱해 한 액터로 그린다
+        self.orbital_set_combo = QComboBox()
+        for key, label in (('single', '선택 원자 하나'), ('sp2', 'sp2 원자 전체'),
+                           ('pi', 'π 계'), ('picked', 'Shift+클릭 원자')):
+            self.orbital_set_combo.addItem(label, key)
+        self.orbital_set_combo.setFont(QFont("Arial", 11))
+        self.orbital_set_combo.currentIndexChanged.connect(self.schedule_redraw)
+        self.orbital_set_combo.hide()
+        self.ao_main_layout.addWidget(self.orbital_set_combo)
+        # 표시 방식: 등치면, |psi|^2 점 구름(점 수 예산), 볼륨 렌더링
+        mode_row = QHBoxLayout()
+        self.orbital_mode_combo = QComboBox()
+        self.orbital_mode_combo.addItem('등치면', 'surface')
+        self.orbital_mode_combo.addItem('점 구름', 'cloud')
+        self.orbital_mode_combo.addItem('볼륨', 'volume')
+        self.cloud_budget_combo = QComboBox()
+        for budget in CLOUD_BUDGETS:
+            self.cloud_budget_combo.addItem(f"{budget:,}점", budget)
+        self.cloud_budget_combo.setCurrentIndex(1)
+        for combo in (self.orbital_mode_combo, self.cloud_budget_combo):
+            combo.setFont(QFont("Arial", 11))
+            combo.currentIndexChanged.connect(self.schedule_redraw)
+            combo.hide()
+            mode_row.addWidget(combo)
+        self.ao_main_layout.addLayout(mode_row)
+        self.cloud = None
+        self.orbital_jobs = OrbitalJobs(self)
+        self.orbital_jobs.ready.connect(self._on_orbital_ready)
+        self.fetch_jobs = FetchJobs(self)
+        self.fetch_jobs.ready.connect(self._on_fetch_ready)
+        self.orbital_actor_names = []
+        self.cloud_timer = QTimer(self)
+        self.cloud_timer.setInterval(30)
+        self.cloud_timer.timeout.connect(self._cloud_step)
+        self.picked_atoms = set()
         right_panel.addLayout(self.ao_main_layout)
         right_panel.addSpacing(10)
         self.atom_list_label = QLabel()
@@ -948,76 +2866,91 @@ class MoleculeApp(QWidget):
         self.atom_list_label.setFrameStyle(QFrame.Box | QFrame.Plain)
         self.atom_list_label.setStyleSheet("background-color: #23272F; color: #F5F6FA;")
         right_panel.addWidget(self.atom_list_label)
+        self.atom_table = QTableWidget(0, 7)
+        self.atom_table.setHorizontalHeaderLabels(['#', '원소', '결합수', '비공유쌍', 'SN', '구조', '혼성'])
+        self.atom_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.atom_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.atom_table.verticalHeader().hide()
+        self.atom_table.setStyleSheet("background-color: #23272F; color: #F5F6FA;")
+        self.atom_table.cellClicked.connect(self.on_atom_table_clicked)
+        self.atom_table.hide()
+        right_panel.addWidget(self.atom_table)
         right_panel.addStretch()
-        self.state = {k: True for k in self.checks}
-        self.atom_meshes = self.bond_meshes = self.atom_positions = None
+        self.state = {k: cb.isChecked() for k, cb in self.checks.items()}
+        self.meshes = self.atom_positions = None
         self.bonds = self.bond_centers = self.bond_lengths = self.bond_angles = []
         self.set_output = lambda text: self.output_box.setHtml(text)
         self.view_offset = np.array([0.0, 0.0, 0.0])
         self.selected_atom_idx = None
-        self.generate_molecule(default="ALL")
+        self.parse_engine = 'native'
+        self.library = None
+        self.library_idx = 0
+        self.trajectory = None
+        self.atom_index = None
+        self.hover_actor = None
+        self.hover_idx = None
+        self.world_picker = vtkWorldPointPicker()
+        self.labels = LabelManager(self.plotter)
+        # 신호가 연달아 와도 한 틱에 한 번만 장면을 다시 만든다
+        self.redraw_scheduler = RedrawScheduler({'scene': self.redraw, 'labels': self.labels.update}, self)
+        # 카메라가 움직이는 동안은 미루고, 멈춘 뒤 한 번만 라벨을 다시 고른다
+        self.label_timer = QTimer(self)
+        self.label_timer.setSingleShot(True)
+        self.label_timer.setInterval(80)
+        self.label_timer.timeout.connect(lambda: self.redraw_scheduler.request('labels'))
+        self.plotter.renderer.GetActiveCamera().AddObserver('ModifiedEvent', self._on_camera_modified)
+        # 주기율표 장면은 창이 뜬 뒤 이벤트 루프에서 만든다
+        QTimer.singleShot(0, self.build_initial_scene)
         self.setFocusPolicy(Qt.StrongFocus)
-        self.plotter.enable_point_picking(callback=self.on_atom_pick, use_picker=True, show_message=False, left_clicking=True, show_point=False)
+        self._press_pos = None
+        self.plotter.iren.add_observer('LeftButtonPressEvent', self._on_left_press)
+        self.plotter.iren.add_observer('LeftButtonReleaseEvent', self._on_left_release)
+        self.plotter.iren.add_observer('MouseMoveEvent', self._on_mouse_move)
+        # 편집 모드의 원자 끌기는 인터랙터 스타일보다 먼저 받아(우선순위 1) 카메라 회전을 막는다
+        self.editor = None
+        self.drag = None
+        self._drag_tags = {}
+        interactor = self.plotter.iren.interactor
+        for event, handler in (('LeftButtonPressEvent', self._on_drag_press),
+                               ('MouseMoveEvent', self._on_drag_move),
+                               ('LeftButtonReleaseEvent', self._on_drag_release)):
+            self._drag_tags[event] = interactor.AddObserver(event, handler, 1.0)
 
     def analyze_StericNumber(self):
-        if not hasattr(self, "molecule") or self.selected_atom_idx is None or self.atom_positions is None:
+        if getattr(self, "molecule", None) is None or self.selected_atom_idx is None or self.atom_positions is None:
             self.StericNumber_info = None
             return
-        atom = self.molecule.atoms[self.selected_atom_idx]
-        symbol = atom.symbol
-        bond_count = len(atom.neighbors)
-        if bond_count == 0:
-            self.StericNumber_info = None
-            return
-        prop = ELEMENT_PROPERTIES.get(symbol)
-        group_number = prop[-2] if prop and len(prop) >= 2 else None
-        if group_number is not None:
-            lone_pairs = get_lone_pair_count(group_number, bond_count)
-        else:
-            lone_pairs = 0
-        SN = bond_count + lone_pairs
-        if SN <= 1:
-            structure, hybrid = None, None
-        elif SN == 2:
-            structure, hybrid = '직선형', 'sp'
-        elif SN == 3 and lone_pairs == 0:
-            structure, hybrid = '평면삼각형', 'sp2'
-        elif SN == 3 and lone_pairs == 1:
-            structure, hybrid = '굽은형1', 'sp2'
-        elif SN == 4 and lone_pairs == 0:
-            structure, hybrid = '사면체형', 'sp3'
-        elif SN == 4 and lone_pairs == 1:
-            structure, hybrid = '삼각뿔형', 'sp3'
-        elif SN == 4 and lone_pairs == 2:
-            structure, hybrid = '굽은형2', 'sp3'
-        else:
-            structure, hybrid = None, None
-        self.StericNumber_info = {
-        'atom_idx': self.selected_atom_idx,
-        'symbol': symbol,
-        'bond_count': bond_count,
-        'lone_pairs': lone_pairs,
-        'SN': SN,
-        'structure': structure,
-        'hybrid': hybrid
-    }
+        self.StericNumber_info = vsepr_info(self.molecule, self.selected_atom_idx)
 
 
     def update_ao_visibility(self, state):
         checked = state == Qt.Checked
         self.s_checkbox.setVisible(checked)
         self.p_checkbox.setVisible(checked)
+        self.hybrid_checkbox.setVisible(checked)
+        self.d_checkbox.setVisible(checked)
+        self.f_checkbox.setVisible(checked)
+        self.orbital_set_combo.setVisible(checked)
+        self.orbital_mode_combo.setVisible(checked)
+        self.cloud_budget_combo.setVisible(checked)
         if not checked:
             self.s_checkbox.setChecked(False)
             self.p_checkbox.setChecked(False)
+            self.d_checkbox.setChecked(False)
+            self.f_checkbox.setChecked(False)
+            self.hybrid_checkbox.setChecked(False)
         self.update_ao_sub_visibility()
 
     def update_ao_sub_visibility(self, state=None):
         p_checked = self.p_checkbox.isChecked()
-        for cb in (self.px_checkbox, self.py_checkbox, self.pz_checkbox):
+        for cb in (self.px_checkbox, self.py_checkbox, self.pz_checkbox, self.ppi_checkbox):
             cb.setVisible(p_checked)
             if not p_checked:
                 cb.setChecked(False)
+        for parent, cb in self.sub_orbital_checks.values():
+            cb.setVisible(parent.isChecked())
+            if not parent.isChecked():
+                cb.setChecked(False)
 
     def ao_toggled(self, state):
         checked = state == Qt.Checked
@@ -1029,27 +2962,276 @@ class MoleculeApp(QWidget):
                 self.selected_atom_idx = None
         else:
             self.selected_atom_idx = None
-        self.redraw()
+        self.schedule_redraw()
+
+    def _on_camera_modified(self, obj, event):
+        if self.labels.view_changed():
+            self.label_timer.start()
+
+    def get_atom_index(self):
+        # 좌표가 바뀌면 atom_index를 None으로 두고, 다음 조회 때 한 번만 다시 만든다
+        if self.atom_index is None and self.meshes is not None and self.atom_positions is not None:
+            self.atom_index = AtomIndex(self.atom_positions, self.meshes.radii)
+        return self.atom_index
+
+    def pick_atom_at(self, x, y):
+        index = self.get_atom_index()
+        if index is None:
+            return None
+        self.world_picker.Pick(x, y, 0, self.plotter.renderer)
+        return index.pick(np.array(self.world_picker.GetPickPosition()) - self.view_offset)
+
+    def _on_left_press(self, obj, event):
+        self._press_pos = obj.GetEventPosition()
+
+    def _on_left_release(self, obj, event):
+        # 놓기 이벤트는 인터랙터 스타일에 걸려 있으므로 위치/키는 인터랙터에서 읽는다
+        obj = self.plotter.iren.interactor
+        pos = obj.GetEventPosition()
+        if self._press_pos is None or abs(pos[0] - self._press_pos[0]) + abs(pos[1] - self._press_pos[1]) > 3:
+            return
+        self._press_pos = None
+        if not self.ao_checkbox.isChecked():
+            return
+        idx = self.pick_atom_at(*pos)
+        if idx is not None and obj.GetShiftKey():
+            self.picked_atoms ^= {idx}
+            self.schedule_redraw()
+        elif idx is not None:
+            self.on_atom_pick(self.atom_positions[idx] + self.view_offset)
+
+    def _on_mouse_move(self, obj, event):
+        if not self.ao_checkbox.isChecked() or self.hover_actor is None:
+            return
+        idx = self.pick_atom_at(*obj.GetEventPosition())
+        if idx == self.hover_idx:
+            return
+        self.hover_idx = idx
+        if idx is None:
+            self.hover_actor.SetVisibility(False)
+        else:
+            self.hover_actor.SetPosition(*(self.atom_positions[idx] + self.view_offset))
+            self.hover_actor.SetScale(self.meshes.radii[idx] * 1.08)
+            self.hover_actor.SetVisibility(True)
+        self.plotter.render()
 
-    def on_atom_pick(self, picked_point, event):
+    def _abort(self, obj, event):
+        obj.GetCommand(self._drag_tags[event]).SetAbortFlag(1)
+
+    def _on_drag_press(self, obj, event):
+        if not self.state.get('edit_mode') or self.relaxation is not None or getattr(self, 'molecule', None) is None:
+            return
+        x, y = obj.GetEventPosition()
+        idx = self.pick_atom_at(x, y)
+        if idx is None:
+            return
+        if self.editor is None or self.editor.molecule is not self.molecule:
+            self.editor = GeometryEditor(self.molecule)
+        else:
+            self.editor.refresh()
+        self.close_trajectory()
+        # 원자 중심의 화면 깊이에 고정한 평면 위에서 움직이고, 잡은 점과 중심의 차이는 유지한다
+        renderer = self.plotter.renderer
+        renderer.SetWorldPoint(*(self.molecule.positions[idx] + self.view_offset), 1.0)
+        renderer.WorldToDisplay()
+        depth = renderer.GetDisplayPoint()[2]
+        self.drag = (idx, depth, self.molecule.positions[idx] - self._drag_point(x, y, depth))
+        self._abort(obj, event)
+
+    def _drag_point(self, x, y, depth):
+        renderer = self.plotter.renderer
+        renderer.SetDisplayPoint(x, y, depth)
+        renderer.DisplayToWorld()
+        world = np.array(renderer.GetWorldPoint())
+        return world[:3] / world[3] - self.view_offset
+
+    def _on_drag_move(self, obj, event):
+        if self.drag is None:
+            return
+        idx, depth, grab = self.drag
+        with TRACER.span('drag', atom=idx):
+            x, y = obj.GetEventPosition()
+            bond_ids, angle_ids = self.editor.move(idx, self._drag_point(x, y, depth) + grab)
+            self.meshes.update_positions(self.molecule.positions, [idx], bond_ids)
+            editor = self.editor
+            self.labels.move('bond_label', bond_ids, editor.bond_label_pos[bond_ids] + self.view_offset,
+                             editor.bond_lengths[bond_ids])
+            self.labels.move('angle_label', angle_ids, editor.angle_label_pos[angle_ids] + self.view_offset,
+                             editor.angle_values[angle_ids])
+            self.plotter.render()
+        self._abort(obj, event)
+
+    def _on_drag_release(self, obj, event):
+        if self.drag is None:
+            return
+        idx = self.drag[0]
+        self.drag = None
+        self._abort(obj, event)
+        self.atom_index = None
+        self.bonds, self.bond_centers, self.bond_lengths, self.bond_angles = self.editor.bond_info()
+        if self.selected_atom_idx is not None:
+            self.analyze_StericNumber()
+        self.set_output(f"<b>{self.atom_symbols[idx]}{idx + 1}</b> 이동")
+        # 오비탈/SN 도형과 라벨 컬링은 놓을 때 한 번만 다시 만든다
+        self.schedule_redraw()
+
+    def on_atom_pick(self, picked_point, event=None):
         if not self.ao_checkbox.isChecked():
             return
         if self.atom_positions is None or len(self.atom_positions) == 0:
             return
-        picked_pos = np.array(picked_point)
-        dists = np.linalg.norm(self.atom_positions + self.view_offset - picked_pos, axis=1)
-        idx = int(np.argmin(dists))
+        index = self.get_atom_index()
+        idx = index.nearest(np.array(picked_point) - self.view_offset)
         self.selected_atom_idx = idx
         self.analyze_StericNumber()
-        self.redraw()
+        self.schedule_redraw()
+
 
+    def checked_orbitals(self):
+        orbitals = []
+        if self.s_checkbox.isChecked(): orbitals.append('s')
+        if self.p_checkbox.isChecked():
+            if self.px_checkbox.isChecked(): orbitals.append('px')
+            if self.py_checkbox.isChecked(): orbitals.append('py')
+            if self.pz_checkbox.isChecked(): orbitals.append('pz')
+            if self.ppi_checkbox.isChecked(): orbitals.append('ppi')
+        orbitals += [name for name, (parent, cb) in self.sub_orbital_checks.items() if parent.isChecked() and cb.isChecked()]
+        if self.hybrid_checkbox.isChecked(): orbitals.append('hybrid')
+        return orbitals
+
+    def orbital_atom_ids(self, mode):
+        """오비탈 묶음 모드별 원자 번호 배열"""
+        molecule = self.molecule
+        n = len(molecule.positions)
+        if mode == 'sp2':
+            return np.flatnonzero(molecule.vsepr['hybrid'] == 2)
+        if mode == 'pi':
+            # 선택 원자가 속한 π 계, 없으면 가장 큰 π 계
+            systems = pi_systems(molecule)
+            sel = self.selected_atom_idx
+            if sel is not None and sel < n and systems[sel] >= 0:
+                return np.flatnonzero(systems == systems[sel])
+            if (systems >= 0).any():
+                return np.flatnonzero(systems == np.bincount(systems[systems >= 0]).argmax())
+            return np.zeros(0, dtype=np.int64)
+        if mode == 'picked':
+            return np.array(sorted(i for i in self.picked_atoms if i < n), dtype=np.int64)
+        return np.zeros(0, dtype=np.int64)
+
+    def add_orbital_field(self, symbols, centers, orbitals, normals=None):
+        """
+        점 구름/볼륨 모드로 오비탈을 그린다. 혼성 오비탈은 등치면으로 남기므로
+        등치면으로 그릴 나머지 목록을 돌려준다
+        """
+        if self.orbital_mode_combo.currentData() == 'cloud':
+            self.start_cloud(cloud_sources(symbols, centers, orbitals, normals))
+        else:
+            grid = orbital_volume(orbital_placements(symbols, centers, orbitals, normals))
+            if grid is not None:
+                self.plotter.add_volume(grid, scalars='psi', cmap=orbital_volume_lut(), clim=(-1, 1),
+                                        show_scalar_bar=False, pickable=False, name='orbital_volume')
+        return [o for o in orbitals if o == 'hybrid']
+
+    def show_orbital_surfaces(self, surfaces, errors=()):
+        """선택 원자 오비탈 액터를 (미리보기였다면 그것을 지우고) 새로 넣는다"""
+        for name in self.orbital_actor_names:
+            self.plotter.remove_actor(name, render=False)
+        self.orbital_actor_names = []
+        for k, surf in enumerate(surfaces):
+            color   = '#FF3333' if surf['color'] == 'red' else '#1976D2'
+            opacity = 0.7 if surf['type'] == 'outer' else 0.4
+            name = f'orbital_{k}'
+            self.plotter.add_mesh(surf['surface'], color=color, opacity=opacity,
+                                  smooth_shading=True, pickable=False, name=name, render=False)
+            self.orbital_actor_names.append(name)
+        for text in errors:
+            self.set_output(f"<b>{text}</b>")
+
+    def _on_orbital_ready(self, job, stage, result):
+        # 그 사이 선택이 바뀌었으면 버린다
+        if job != self.orbital_jobs.job_id:
+            return
+        if isinstance(result, Exception):
+            self.set_output(f"<b>오비탈 생성 오류: {result}</b>")
+            return
+        self.show_orbital_surfaces(*result)
+        self.plotter.render()
+
+    def start_cloud(self, sources):
+        """첫 배치를 바로 그리고, 나머지는 cloud_timer로 조금씩 채운다"""
+        budget = self.cloud_budget_combo.currentData()
+        self.cloud = ElectronCloud(sources, budget)
+        if self.cloud.done:
+            self.cloud = None
+            return
+        self.cloud.step()
+        self.plotter.add_mesh(self.cloud.mesh, scalars='rgb', rgb=True, opacity=0.6,
+                              point_size=CLOUD_BUDGETS[budget], render_points_as_spheres=True,
+                              pickable=False, name='electron_cloud')
+        if not self.cloud.done:
+            self.cloud_timer.start()
+
+    def _cloud_step(self):
+        if self.cloud is None or not self.cloud.step():
+            self.cloud_timer.stop()
+        self.plotter.render()
 
     def toggle_option(self, key, state):
         self.state[key] = bool(state)
+        if key == 'show_atom_table':
+            self.update_atom_table()
+            return
+        self.schedule_redraw()
+
+    def update_atom_table(self):
+        table = self.atom_table
+        molecule = getattr(self, 'molecule', None)
+        if not self.state.get('show_atom_table') or molecule is None or molecule.vsepr is None:
+            table.hide()
+            return
+        v = molecule.vsepr
+        table.setSortingEnabled(False)
+        table.setUpdatesEnabled(False)
+        table.setRowCount(len(molecule.atoms))
+        for row, atom in enumerate(molecule.atoms):
+            values = [row, atom.symbol, v['bond_count'][row], v['lone_pairs'][row], v['SN'][row],
+                      VSEPR_SHAPES[v['shape'][row]] or '-', HYBRIDS[v['hybrid'][row]] or '-']
+            for col, value in enumerate(values):
+                item = QTableWidgetItem()
+                # 숫자 열은 숫자로 정렬되도록 DisplayRole에 int를 넣는다
+                item.setData(Qt.DisplayRole, int(value) if col in (0, 2, 3, 4) else value)
+                table.setItem(row, col, item)
+        table.setUpdatesEnabled(True)
+        table.setSortingEnabled(True)
+        table.show()
+
+    def on_atom_table_clicked(self, row, col):
+        idx = int(self.atom_table.item(row, 0).data(Qt.DisplayRole))
+        if not self.ao_checkbox.isChecked():
+            self.ao_checkbox.setChecked(True)
+        self.selected_atom_idx = idx
+        self.analyze_StericNumber()
+        self.schedule_redraw()
+
+    def atom_colors(self):
+        """현재 색 모드에 맞는 원자별 RGB"""
+        molecule = getattr(self, 'molecule', None)
+        if self.state.get('color_by_hybrid') and molecule is not None and molecule.vsepr is not None:
+            return HYBRID_COLORS[molecule.vsepr['hybrid']]
+        return None
+
+    def build_initial_scene(self):
+        if self.meshes is None:
+            self.generate_molecule(default="ALL")
+        # 예약된 redraw를 기다리지 않고 바로 그려야 'first scene'이 첫 장면의 구성과 렌더링을 포함한다
         self.redraw()
+        startup_mark('first scene')
 
     def generate_molecule(self, default=None):
         inp = self.mol_entry.text().strip() if not default else default
+        # 아직 불러오는 중인 이전 입력의 결과가 새 장면을 덮어쓰지 않게 한다
+        self.fetch_jobs.cancel()
+        self.close_trajectory()
         if not inp:
             self.set_output("<b>분자식을 입력하세요.</b>")
             self.atom_list_label.setText("")
@@ -1057,18 +3239,15 @@ class MoleculeApp(QWidget):
         if inp.lower() == "all":
             positions = get_periodic_table_positions()
             tokens = [sym for row in PERIODIC_TABLE_GRID for sym in row if sym and sym in ELEMENT_PROPERTIES]
-            atom_meshes = []
-            atom_infos = []
+            numbers = atomic_numbers(tokens)
             centers = [positions[sym] for sym in tokens]
-            for t, center in zip(tokens, centers):
-                prop = ELEMENT_PROPERTIES[t]
-                color = prop[4] if prop and prop[4] else '#9E9E9E'
-                r = prop[0]
-                atom_meshes.append((pv.Sphere(radius=r, center=center, theta_resolution=32, phi_resolution=32), color))
-                atom_infos.append(f"{t}: EN({prop[1]}), R({prop[0]}), IE1({prop[2]}), EA({prop[3]})")
-            self.atom_meshes = atom_meshes
-            self.bond_meshes = []
+            atom_infos = [f"{t}: {element_info(z)}" for t, z in zip(tokens, numbers)]
+            self.meshes = MoleculeMeshes(centers, ELEMENT_TABLE['vdw_radius'][numbers], element_colors(numbers))
             self.atom_positions = np.array(centers)
+            self.atom_index = None
+            self.atom_symbols = list(tokens)
+            self.molecule = None
+            self.StericNumber_info = None
             self.bonds = []
             self.bond_centers = []
             self.bond_lengths = []
@@ -1077,32 +3256,39 @@ class MoleculeApp(QWidget):
             self.selected_atom_idx = 0 if self.ao_checkbox.isChecked() and len(centers) > 0 else None
             self.set_output("<b>주기율표 배치 생성 완료</b>")
             self.atom_list_label.setText('\n'.join(atom_infos))
-            self.redraw()
+            self.update_atom_table()
+            self.schedule_redraw()
             return
         else:
             tokens = inp.split()
+        lib_path, _, lib_key = inp.partition('#')
+        if lib_path.lower().endswith(('.sdf', '.sd')) and os.path.isfile(lib_path):
+            self.open_library(lib_path, lib_key)
+            return
+        if inp.lower().endswith('.xyz') and os.path.isfile(inp):
+            try:
+                self.open_trajectory(Trajectory.from_xyz(inp))
+            except Exception as e:
+                self.set_output(f"<b>오류:</b> {e}")
+                self.atom_list_label.setText("")
+                return
+            self.set_output(f"<b>{os.path.basename(inp)}</b> 생성 완료")
+            self.schedule_redraw()
+            return
         if all(t in ELEMENT_PROPERTIES for t in tokens) and len(tokens) > 0:
-            atom_meshes = []
-            atom_infos = []
             spacing = 2.5
-            radii = [ELEMENT_PROPERTIES[t][0] for t in tokens]
-            total_width = sum(r*2+spacing for r in radii) - spacing
-            start = -total_width / 2 + radii[0]
-            centers = []
-            x = start
-            for i, t in enumerate(tokens):
-                r = ELEMENT_PROPERTIES[t][0]
-                centers.append([x, 0, 0])
-                x += r * 2 + spacing
-            for t, center in zip(tokens, centers):
-                prop = ELEMENT_PROPERTIES[t]
-                color = prop[4] if prop and prop[4] else '#9E9E9E'
-                r = prop[0]
-                atom_meshes.append((pv.Sphere(radius=r, center=center, theta_resolution=32, phi_resolution=32), color))
-                atom_infos.append(f"{t}: EN({prop[1]}), R({prop[0]}), IE1({prop[2]}), EA({prop[3]})")
-            self.atom_meshes = atom_meshes
-            self.bond_meshes = []
+            numbers = atomic_numbers(tokens)
+            radii = ELEMENT_TABLE['vdw_radius'][numbers]
+            widths = radii * 2 + spacing
+            x = -(widths.sum() - spacing) / 2 + radii[0] + np.cumsum(widths) - widths
+            centers = np.column_stack([x, np.zeros_like(x), np.zeros_like(x)])
+            atom_infos = [f"{t}: {element_info(z)}" for t, z in zip(tokens, numbers)]
+            self.meshes = MoleculeMeshes(centers, radii, element_colors(numbers))
             self.atom_positions = np.array(centers)
+            self.atom_index = None
+            self.atom_symbols = list(tokens)
+            self.molecule = None
+            self.StericNumber_info = None
             self.bonds = []
             self.bond_centers = []
             self.bond_lengths = []
@@ -1111,31 +3297,216 @@ class MoleculeApp(QWidget):
             self.selected_atom_idx = 0 if self.ao_checkbox.isChecked() and len(centers) > 0 else None
             self.set_output("<b>단일 원자 공모형 생성 완료</b>")
             self.atom_list_label.setText('\n'.join(atom_infos))
-            self.redraw()
+            self.update_atom_table()
+            self.schedule_redraw()
             return
-        try:
-            sdf_text, iupac_name, formula, synonyms, input_type = fetch_3d_sdf_and_iupac_any(inp)
-            mol = parse_mol(sdf_text)
-            self.molecule = Molecule(mol)
-            self.atom_meshes, self.bond_meshes = build_meshes(self.molecule)
-            self.atom_positions = self.molecule.get_positions()
-            self.atom_symbols = self.molecule.get_symbols()
+        # 네트워크 조회와 3D 임베딩은 수십 초까지 걸릴 수 있으므로 백그라운드에서 하고 결과만 받아 그린다
+        engine = self.parse_engine
+        def load():
+            with TRACER.span('fetch', query=inp):
+                sdf_text, iupac_name, formula, synonyms, input_type = fetch_3d_sdf_and_iupac_any(inp)
+            with TRACER.span('parse', engine=engine):
+                molecule = parse_molecule(sdf_text, engine=engine)
+            return inp, molecule, iupac_name, formula, synonyms, input_type
+        self.fetch_jobs.submit(load)
+        self.set_output(f"<b>{inp}</b> 불러오는 중...")
+
+    def _on_fetch_ready(self, job, result):
+        if job != self.fetch_jobs.job_id:
+            return
+        if isinstance(result, Exception):
+            self.set_output(f"<b>오류:</b> {result}")
+            self.atom_list_label.setText("")
+            return
+        inp, molecule, iupac_name, formula, synonyms, input_type = result
+        self.set_molecule(molecule)
+        if input_type == 'name':
+            formula_disp = formula if formula else "-"
+            self.set_output(f"<b>{formula_disp}</b> 생성 완료")
+        else:
+            mol_name = get_pretty_mol_name(iupac_name, synonyms, inp)
+            self.set_output(f"<b>{mol_name}</b> 생성 완료")
+        self.schedule_redraw()
+
+    def set_molecule(self, molecule):
+        self.stop_relaxation()
+        self.molecule = molecule
+        with TRACER.span('build_meshes', atoms=len(molecule.atoms)):
+            self.meshes = build_meshes(self.molecule)
+        self.atom_positions = self.molecule.get_positions()
+        self.atom_index = None
+        self.atom_symbols = self.molecule.get_symbols()
+        with TRACER.span('get_bond_info', bonds=len(molecule.bonds)):
             self.bonds, self.bond_centers, self.bond_lengths, self.bond_angles = get_bond_info(self.molecule)
-            self.view_offset = np.array([0.0, 0.0, 0.0])
-            self.selected_atom_idx = 0 if self.ao_checkbox.isChecked() and len(self.atom_positions) > 0 else None
-            if input_type == 'name':
-                formula_disp = formula if formula else "-"
-                self.set_output(f"<b>{formula_disp}</b> 생성 완료")
+        self.view_offset = np.array([0.0, 0.0, 0.0])
+        self.selected_atom_idx = 0 if self.ao_checkbox.isChecked() and len(self.atom_positions) > 0 else None
+        self.StericNumber_info = None
+        self.atom_list_label.setText(self.molecule.atom_summary())
+        self.update_atom_table()
+
+    def open_library(self, path, key=''):
+        try:
+            if self.library is None or self.library.path != path:
+                if self.library is not None:
+                    self.library.close()
+                self.library = None
+                self.library = SDFLibrary(path, engine=self.parse_engine)
+            key = key.strip()
+            if not key:
+                idx = 0
+            elif key.isdigit():
+                idx = int(key) - 1
             else:
-                mol_name = get_pretty_mol_name(iupac_name, synonyms, inp)
-                self.set_output(f"<b>{mol_name}</b> 생성 완료")
-            self.atom_list_label.setText(self.molecule.atom_summary())
-            self.redraw()
+                idx = self.library.index_of(key)
         except Exception as e:
             self.set_output(f"<b>오류:</b> {e}")
             self.atom_list_label.setText("")
+            return
+        for w in (self.lib_prev_button, self.lib_pos_label, self.lib_next_button, self.lib_traj_button):
+            w.show()
+        self.show_library_record(idx)
+
+    def show_library_record(self, idx):
+        if self.library is None or len(self.library) == 0:
+            return
+        idx = max(0, min(idx, len(self.library) - 1))
+        self.close_trajectory()
+        try:
+            with TRACER.span('parse', engine=self.library.engine, record=idx):
+                molecule = self.library[idx]
+            self.set_molecule(molecule)
+        except Exception as e:
+            self.set_output(f"<b>오류:</b> {idx + 1}번 레코드: {e}")
+            return
+        self.library_idx = idx
+        self.lib_pos_label.setText(f"{idx + 1} / {len(self.library)}")
+        name = self.library.names[idx] or os.path.basename(self.library.path)
+        self.set_output(f"<b>{name}</b> 생성 완료")
+        self.schedule_redraw()
+
+    def open_library_trajectory(self):
+        if self.library is None:
+            return
+        try:
+            self.open_trajectory(Trajectory.from_library(self.library))
+        except Exception as e:
+            self.set_output(f"<b>오류:</b> {e}")
+            return
+        self.set_output(f"<b>{os.path.basename(self.library.path)}</b> 궤적 {len(self.trajectory)} 프레임")
+        self.schedule_redraw()
+
+    def open_trajectory(self, trajectory):
+        self.close_trajectory()
+        self.set_molecule(trajectory.molecule(0))
+        self.trajectory = trajectory
+        self.frame_slider.blockSignals(True)
+        self.frame_slider.setRange(0, len(trajectory) - 1)
+        self.frame_slider.setValue(0)
+        self.frame_slider.blockSignals(False)
+        self.frame_label.setText(f"1 / {len(trajectory)}")
+        for w in (self.play_button, self.frame_slider, self.frame_label):
+            w.setVisible(len(trajectory) > 1)
+
+    def close_trajectory(self):
+        self.play_timer.stop()
+        self.play_button.setText("재생")
+        self.trajectory = None
+        for w in (self.play_button, self.frame_slider, self.frame_label):
+            w.hide()
+
+    def toggle_playback(self):
+        if self.trajectory is None:
+            return
+        if self.play_timer.isActive():
+            self.play_timer.stop()
+            self.play_button.setText("재생")
+            self.bonds, self.bond_centers, self.bond_lengths, self.bond_angles = get_bond_info(self.molecule)
+        else:
+            self.play_timer.start()
+            self.play_button.setText("정지")
+        self.schedule_redraw()
+
+    def advance_frame(self):
+        if self.trajectory is None:
+            return
+        self.frame_slider.setValue((self.frame_slider.value() + 1) % len(self.trajectory))
+
+    def set_frame(self, idx):
+        # 메시는 새로 만들지 않고 좌표 버퍼만 제자리 갱신
+        if self.trajectory is None:
+            return
+        self.molecule.positions[:] = self.trajectory.frames[idx]
+        self.meshes.update_positions(self.molecule.positions)
+        self.atom_index = None
+        self.frame_label.setText(f"{idx + 1} / {len(self.trajectory)}")
+        if self.play_timer.isActive():
+            self.plotter.render()
+        else:
+            self.bonds, self.bond_centers, self.bond_lengths, self.bond_angles = get_bond_info(self.molecule)
+            self.schedule_redraw()
+
+    def toggle_relaxation(self):
+        if self.relaxation is not None:
+            self.stop_relaxation()
+            return
+        if getattr(self, 'molecule', None) is None or len(self.molecule.atoms) == 0:
+            return
+        self.close_trajectory()
+        try:
+            self.relaxation = Relaxation(self.molecule)
+        except Exception as e:
+            self.set_output(f"<b>오류:</b> {e}")
+            return
+        self.relax_button.setText("중지")
+        self.relax_timer.start()
+        # 최적화 중에는 라벨을 숨긴 장면으로 한 번만 다시 그리고 이후로는 좌표만 갱신
+        self.schedule_redraw()
+
+    def _relax_step(self):
+        relaxation = self.relaxation
+        positions = relaxation.poll()
+        if positions is not None:
+            with TRACER.span('relax_frame', atoms=relaxation.n_atoms):
+                self.molecule.positions[:] = positions
+                self.meshes.update_positions(self.molecule.positions)
+                self.atom_index = None
+                self.plotter.render()
+            self.set_output(f"<b>{relaxation.force_field}</b> 최적화 중: {relaxation.energy:.2f} kcal/mol "
+                            f"({int(relaxation.seq) // 2}회)")
+        if relaxation.done or relaxation.failed:
+            self.stop_relaxation()
+
+    def stop_relaxation(self):
+        relaxation = self.relaxation
+        if relaxation is None:
+            return
+        self.relax_timer.stop()
+        self.relaxation = None
+        self.relax_button.setText("최적화")
+        positions = relaxation.poll()
+        failed = relaxation.failed
+        relaxation.close()
+        if positions is not None:
+            self.molecule.positions[:] = positions
+            self.meshes.update_positions(self.molecule.positions)
+        if failed and relaxation.energy is None:
+            self.set_output("<b>오류:</b> 힘장 최적화에 실패했습니다.")
+        elif relaxation.energy is not None:
+            self.set_output(f"<b>{relaxation.force_field}</b> 최적화 완료: {relaxation.energy:.2f} kcal/mol")
+        self.atom_index = None
+        self.bonds, self.bond_centers, self.bond_lengths, self.bond_angles = get_bond_info(self.molecule)
+        self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """다음 이벤트 루프 틱에 장면 전체를 한 번 다시 만든다 (신호 인자는 무시)"""
+        self.redraw_scheduler.request('scene')
 
     def redraw(self):
+        self.redraw_scheduler.mark_clean()
+        with TRACER.span('redraw'):
+            self._redraw()
+
+    def _redraw(self):
         self.plotter.clear()
         offset = self.view_offset if hasattr(self, "view_offset") else np.array([0.0, 0.0, 0.0])
         ao_on   = self.ao_checkbox.isChecked()
@@ -1146,79 +3517,107 @@ class MoleculeApp(QWidget):
             and hasattr(self, "atom_symbols")
             and 0 <= sel_idx < len(self.atom_symbols)
         )
-        for i, (mesh, color) in enumerate(self.atom_meshes or []):
-            mesh_copy = mesh.copy()
-            mesh_copy.translate(offset)
-            if valid_ao and i == sel_idx:
-                self.plotter.add_mesh(mesh_copy, color=color, opacity=0.2,
-                                    specular=0.4, smooth_shading=True)
-                center      = mesh_copy.center
+        if self.meshes is not None:
+            colors = self.atom_colors()
+            if colors is not None or self.meshes.recolored:
+                self.meshes.atoms.set_colors(colors if colors is not None else self.meshes.atom_rgb)
+                self.meshes.recolored = colors is not None
+            self.meshes.highlight(sel_idx if valid_ao else None)
+            actor = self.plotter.add_mesh(self.meshes.atoms.mesh, scalars='rgba', rgba=True,
+                                          specular=0.4, name='atoms')
+            actor.prop.interpolation = 'gouraud'
+            actor.position = offset
+            if self.meshes.bonds is not None:
+                actor = self.plotter.add_mesh(self.meshes.bonds.mesh, scalars='rgba', rgba=True,
+                                              name='bonds')
+                actor.prop.interpolation = 'gouraud'
+                actor.position = offset
+            self.hover_actor = self.plotter.add_mesh(pv.Sphere(radius=1.0, theta_resolution=16, phi_resolution=16),
+                                                     style='wireframe', color='#FFD54F', opacity=0.6,
+                                                     pickable=False, name='hover')
+            self.hover_actor.SetVisibility(False)
+            self.hover_idx = None
+            if valid_ao:
+                center      = self.atom_positions[sel_idx] + offset
                 atom_symbol = self.atom_symbols[sel_idx]
-                atom_radius = ELEMENT_PROPERTIES.get(atom_symbol, (0.53,))[0]
+                atom_radius = ELEMENT_TABLE['vdw_radius'][ATOMIC_NUMBERS.get(atom_symbol, 1)]
                 nucleus = pv.Sphere(radius=atom_radius/6, center=center,
                                     theta_resolution=32, phi_resolution=32)
                 self.plotter.add_mesh(nucleus, color='#FF3333', opacity=1.0,
                                     specular=0.6, smooth_shading=True)
-            else:
-                self.plotter.add_mesh(mesh_copy, color=color, opacity=1.0,
-                                    specular=0.4, smooth_shading=True)
-        for mesh, color in self.bond_meshes or []:
-            mesh_copy = mesh.copy()
-            mesh_copy.translate(offset)
-            self.plotter.add_mesh(mesh_copy, color=color, opacity=1.0,
-                                smooth_shading=True)
         if self.StericNumber_info:
             info = self.StericNumber_info
             text  = (f"결합수: {info['bond_count']}, 비공유전자쌍: {info['lone_pairs']}, SN: {info['SN']}<br>"
                     f"결합구조: {info['structure']}, 혼성화: {info['hybrid']}")
             self.set_output(text)
-        if valid_ao and self.atom_positions is not None:
-            atom_symbol = self.atom_symbols[sel_idx]
-            atom_center = self.atom_positions[sel_idx] + offset
-            checked_orbitals = []
-            if self.s_checkbox.isChecked(): checked_orbitals.append('s')
-            if self.p_checkbox.isChecked():
-                if self.px_checkbox.isChecked(): checked_orbitals.append('px')
-                if self.py_checkbox.isChecked(): checked_orbitals.append('py')
-                if self.pz_checkbox.isChecked(): checked_orbitals.append('pz')
-            for orb_type in checked_orbitals:
-                try:
-                    ho = HydrogenOrbital(
-                        orb_type,
-                        HYDROGEN_ORBITAL_RADII,
-                        ELEMENT_ORBITAL_RADII,
-                        atom_symbol
-                    )
-                except Exception as e:
-                    self.set_output(f"<b>오비탈 생성 오류: {e}</b>")
-                    continue
-                for surf in ho.generate_isosurfaces():
-                    mesh_o = surf['surface'].copy()
-                    mesh_o.points += atom_center
-                    color   = '#FF3333' if surf['color'] == 'red' else '#1976D2'
-                    opacity = 0.7 if surf['type'] == 'outer' else 0.4
-                    self.plotter.add_mesh(mesh_o, color=color,
-                                        opacity=opacity, smooth_shading=True)
-        if valid_ao and self.StericNumber_info:
+        batch_mode = self.orbital_set_combo.currentData()
+        orbital_mode = self.orbital_mode_combo.currentData()
+        self.cloud_timer.stop()
+        self.cloud = None
+        self.orbital_jobs.cancel()
+        self.orbital_actor_names = []
+        if ao_on and batch_mode != 'single' and getattr(self, 'molecule', None) is not None:
+            with TRACER.span('orbitals', mode=batch_mode):
+                ids = self.orbital_atom_ids(batch_mode)
+                orbitals = self.checked_orbitals()
+                if orbital_mode != 'surface':
+                    normals = pi_normals(self.molecule, ids) if 'ppi' in orbitals and len(ids) else None
+                    orbitals = self.add_orbital_field([self.molecule.atoms[i].symbol for i in ids.tolist()],
+                                                      self.molecule.positions[ids] + offset, orbitals, normals)
+                mesh = orbital_batch(self.molecule, ids, orbitals, offset)
+                if mesh is not None:
+                    actor = self.plotter.add_mesh(mesh, scalars='rgba', rgba=True,
+                                                  pickable=False, name='orbital_batch')
+                    actor.prop.interpolation = 'gouraud'
+        elif valid_ao and self.atom_positions is not None:
+            with TRACER.span('orbitals'):
+                atom_symbol = self.atom_symbols[sel_idx]
+                atom_center = self.atom_positions[sel_idx] + offset
+                checked_orbitals = self.checked_orbitals()
+                if orbital_mode != 'surface':
+                    normals = None
+                    if 'ppi' in checked_orbitals and getattr(self, 'molecule', None) is not None:
+                        normals = pi_normals(self.molecule, [sel_idx])
+                    checked_orbitals = self.add_orbital_field([atom_symbol], atom_center[None], checked_orbitals, normals)
+                molecule = getattr(self, 'molecule', None)
+                build = partial(atom_orbital_surfaces, atom_symbol, atom_center, checked_orbitals, molecule, sel_idx, offset)
+                if not checked_orbitals:
+                    pass
+                elif orbital_cache_ready(atom_symbol, checked_orbitals, molecule, sel_idx):
+                    self.show_orbital_surfaces(*build())
+                else:
+                    # 캐시에 없으면 백그라운드에서 미리보기 -> 전체 해상도 순으로 받아 그린다
+                    self.orbital_jobs.submit(lambda grid_size, cancelled: build(grid_size=grid_size, cancelled=cancelled))
+        show_all_sn = self.state.get('show_all_sn') and getattr(self, 'molecule', None) is not None
+        if show_all_sn:
+            shapes = molecule_sn_shapes(self.molecule, offset)
+            if shapes is not None:
+                self.plotter.add_mesh(shapes, scalars='rgb', rgb=True, line_width=2,
+                                      pickable=False, name='sn_all')
+        elif valid_ao and self.StericNumber_info:
             sn                = self.StericNumber_info['SN']
             atom_pos          = self.atom_positions[sel_idx] + offset
             neighbor_indices  = list(self.molecule.atoms[sel_idx].neighbors)
             neighbor_positions= [self.atom_positions[i] + offset for i in neighbor_indices]
             add_sn_shape(self.plotter, sn, atom_pos, neighbor_positions)
-        if self.state.get('show_bond_length') and self.bond_lengths:
-            pos = get_bond_label_pos_perp(self.atom_positions+offset, self.bonds, offset=0.5)
-            labels = [f"{l:.2f}Å" for l in self.bond_lengths]
-            self.plotter.add_point_labels(pos, labels,
-                                        font_size=15, text_color='#A5D6A7',
-                                        point_color='#23272F', point_size=18,
-                                        name='bond_label')
-        if self.state.get('show_bond_angle') and self.bond_angles:
-            pos_vals = [c+offset for c, _ in self.bond_angles]
-            angle_vals = [f"{a:.1f}°" for _, a in self.bond_angles]
-            self.plotter.add_point_labels(pos_vals, angle_vals,
-                                        font_size=15, text_color='#FFD54F',
-                                        point_color='#23272F', point_size=18,
-                                        name='angle_label')
+        if self.state.get('show_contacts') and getattr(self, 'molecule', None) is not None:
+            with TRACER.span('contacts'):
+                contacts, n_contacts, n_clashes = contact_polydata(self.molecule, offset)
+            if contacts is not None:
+                self.plotter.add_mesh(contacts, scalars='rgb', rgb=True, line_width=2,
+                                      pickable=False, name='contacts')
+            TRACER.count('contacts', contacts=n_contacts, clashes=n_clashes)
+        playing = self.play_timer.isActive() or self.relax_timer.isActive()
+        with TRACER.span('labels'):
+            self.labels.clear()
+            if self.state.get('show_bond_length') and len(self.bond_lengths) and not playing:
+                self.labels.set('bond_label', get_bond_label_pos_perp(self.atom_positions+offset, self.bonds, offset=0.5),
+                                self.bond_lengths, lambda l: f"{l:.2f}Å",
+                                font_size=15, text_color='#A5D6A7', point_color='#23272F', point_size=18)
+            if self.state.get('show_bond_angle') and len(self.bond_angles) and not playing:
+                self.labels.set('angle_label', [c+offset for c, _ in self.bond_angles],
+                                [a for _, a in self.bond_angles], lambda a: f"{a:.1f}°",
+                                font_size=15, text_color='#FFD54F', point_color='#23272F', point_size=18)
         self.plotter.set_background("#000000")
         self.plotter.add_box_axes(line_width=3,
                                 xlabel='X', ylabel='Y', zlabel='Z',
@@ -1229,10 +3628,42 @@ class MoleculeApp(QWidget):
                                 xtitle='X', ytitle='Y', ztitle='Z',
                                 color='#393D45', font_size=14,
                                 corner_factor=0.9)
-        self.plotter.render()
+        actors, triangles = scene_counts(self.plotter.renderer)
+        TRACER.count('scene', actors=actors, triangles=triangles)
+        if self.state.get('show_trace'):
+            self.plotter.add_text(TRACER.summary(TRACE_STAGES), position='upper_right', font_size=9,
+                                  color='#B0BEC5', name='trace_overlay')
+        with TRACER.span('labels'):
+            self.labels.update(render=False)
+        with TRACER.span('render'):
+            self.plotter.render()
+
+STARTUP_BUDGET = float(os.environ.get('MVS_STARTUP_BUDGET', 2.0))
+
+def startup_report(budget=STARTUP_BUDGET):
+    """단계별 소요 시간(ms)과 누적 시간 표. 마지막 줄은 예산 대비 총 시간"""
+    lines = []
+    t0 = prev = STARTUP_MARKS[0][1]
+    for stage, t in STARTUP_MARKS[1:]:
+        lines.append(f"{stage:<16}{(t - prev) * 1000:9.1f} ms {(t - t0) * 1000:9.1f} ms")
+        prev = t
+    total = prev - t0
+    status = "OK" if total <= budget else "예산 초과"
+    lines.append(f"{'total':<16}{total * 1000:9.1f} ms / {budget * 1000:.0f} ms {status}")
+    return "\n".join(lines), total <= budget
 
 if __name__ == "__main__":
+    report_startup = '--startup-report' in sys.argv
+    if report_startup:
+        sys.argv.remove('--startup-report')
+    # --trace 경로 또는 MVS_TRACE 환경 변수: 종료 시 Chrome trace-event JSON 저장
+    trace_path = os.environ.get('MVS_TRACE')
+    if '--trace' in sys.argv:
+        k = sys.argv.index('--trace')
+        trace_path = sys.argv[k + 1] if k + 1 < len(sys.argv) else 'trace.json'
+        del sys.argv[k:k + 2]
     app = QApplication(sys.argv)
+    startup_mark('QApplication')
     app.setStyle("Fusion")
     pal = QPalette()
     pal.setColor(QPalette.Window, QColor(24, 26, 32))
@@ -1244,6 +3675,21 @@ if __name__ == "__main__":
     pal.setColor(QPalette.Highlight, QColor(25, 118, 210))
     pal.setColor(QPalette.HighlightedText, QColor(245, 246, 250))
     app.setPalette(pal)
+    if trace_path:
+        app.aboutToQuit.connect(lambda: TRACER.export(trace_path))
     win = MoleculeApp()
+    app.aboutToQuit.connect(win.orbital_jobs.shutdown)
+    app.aboutToQuit.connect(win.fetch_jobs.shutdown)
+    app.aboutToQuit.connect(EMBEDDER.close)
+    app.aboutToQuit.connect(win.stop_relaxation)
+    startup_mark('window')
     win.show()
+    startup_mark('show')
+    if report_startup:
+        # 첫 장면이 그려진 뒤 보고서를 출력하고 종료 (예산 초과 시 종료 코드 1)
+        def finish_startup_report():
+            text, ok = startup_report()
+            print(text, file=sys.stderr)
+            app.exit(0 if ok else 1)
+        QTimer.singleShot(0, finish_startup_report)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+3DMVS 성능 벤치마크
+
+    python bench.py                                  # 결과 JSON을 표준출력으로
+    python bench.py --sizes 10 1000 --out result.json
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json   # 기준보다 느려지면 종료 코드 1
+
+합성 분자(10 ~ 100k 원자)와 bench_data/의 SDF만 사용하므로 네트워크가 필요 없다.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(ROOT, 'bench_data')
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+
+
+def load_app_module():
+    # 파일 이름이 숫자로 시작하므로 importlib로 불러온다
+    spec = importlib.util.spec_from_file_location('mvs', os.path.join(ROOT, '3DMVS.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['mvs'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def synthetic_molecule(n_atoms, seed=0):
+    """
+    간격 1.5 Å 입방 격자 위의 n_atoms개 원자. +x 이웃과는 항상, +y 이웃과는 짝수 칸에서 결합해
+    결합수 1~4인 원자가 섞이게 한다. 7번째마다 O, 11번째마다 N, 나머지는 C.
+    """
+    side = int(np.ceil(n_atoms ** (1 / 3)))
+    grid = np.indices((side, side, side)).reshape(3, -1).T[:n_atoms]
+    rng = np.random.default_rng(seed)
+    positions = grid * 1.5 + rng.normal(scale=0.05, size=grid.shape)
+    symbols = ['O' if i % 7 == 6 else 'N' if i % 11 == 10 else 'C' for i in range(n_atoms)]
+    key = {tuple(p): i for i, p in enumerate(grid.tolist())}
+    bonds = []
+    for i, (x, y, z) in enumerate(grid.tolist()):
+        j = key.get((x + 1, y, z))
+        if j is not None:
+            bonds.append((i, j))
+        j = key.get((x, y + 1, z))
+        if j is not None and (x + z) % 2 == 0:
+            bonds.append((i, j))
+    return symbols, positions, np.array(bonds, dtype=np.int64).reshape(-1, 2)
+
+
+def to_rdkit(symbols, positions, bonds):
+    from rdkit import Chem
+    from rdkit.Geometry import Point3D
+    rw = Chem.RWMol()
+    for sym in symbols:
+        rw.AddAtom(Chem.Atom(sym))
+    for i, j in bonds.tolist():
+        rw.AddBond(i, j, Chem.BondType.SINGLE)
+    conf = Chem.Conformer(len(symbols))
+    for k, (x, y, z) in enumerate(positions.tolist()):
+        conf.SetAtomPosition(k, Point3D(x, y, z))
+    mol = rw.GetMol()
+    mol.AddConformer(conf, assignId=True)
+    return mol
+
+
+def measure(fn, repeat):
+    """repeat번 실행한 시간(min/median)과, 별도 1회 실행의 tracemalloc 최대 메모리"""
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'min_s': min(times), 'median_s': float(np.median(times)), 'repeat': repeat, 'peak_bytes': peak}
+
+
+def record(results, key, fn, repeat):
+    print(f"측정 중: {key}", file=sys.stderr, flush=True)
+    results[key] = measure(fn, repeat)
+    print(f"  {results[key]['median_s'] * 1000:.1f} ms, {results[key]['peak_bytes'] / 1e6:.1f} MB", file=sys.stderr, flush=True)
+
+
+def default_repeat(n_atoms):
+    return 5 if n_atoms <= 1000 else 3 if n_atoms <= 10000 else 1
+
+
+class RedrawHarness:
+    """오프스크린 MoleculeApp 하나를 재사용해 set_molecule + redraw를 잰다"""
+    def __init__(self, mvs):
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([])
+        self.win = mvs.MoleculeApp()
+    def run(self, molecule):
+        # set_molecule이 결합 정보까지 계산하므로 generate 후 화면 갱신 전체를 잰 셈이 된다
+        self.win.set_molecule(molecule)
+        self.win.redraw()
+
+
+def bench_molecule(mvs, results, label, molecule, rdkit_mol, repeat, redraw):
+    if rdkit_mol is not None:
+        record(results, f'build_from_rdkit/{label}', lambda: mvs.Molecule(rdkit_mol), repeat)
+    record(results, f'build_meshes/{label}', lambda: mvs.build_meshes(molecule), repeat)
+    record(results, f'get_bond_info/{label}', lambda: mvs.get_bond_info(molecule), repeat)
+    record(results, f'perceive_bonds/{label}', lambda: mvs.perceive_bonds(molecule.numbers, molecule.positions), repeat)
+    record(results, f'find_contacts/{label}', lambda: mvs.find_contacts(molecule), repeat)
+    bonds = molecule.bond_index.tolist()
+    record(results, f'get_bond_label_pos_perp/{label}',
+           lambda: mvs.get_bond_label_pos_perp(molecule.positions, bonds), repeat)
+    if redraw is not None:
+        record(results, f'redraw/{label}', lambda: redraw.run(molecule), repeat)
+
+
+def bench_fixed(mvs, results, repeat):
+    for sym, orb in (('C', 's'), ('C', 'px'), ('C', 'pz'), ('Fe', 'dz2'), ('U', 'fxyz')):
+        def run(sym=sym, orb=orb):
+            mvs.HydrogenOrbital(orb, mvs.HYDROGEN_ORBITAL_RADII, mvs.ELEMENT_ORBITAL_RADII, sym).generate_isosurfaces()
+        record(results, f'generate_isosurfaces/{sym}-{orb}', run, repeat)
+    def cloud():
+        c = mvs.ElectronCloud(mvs.cloud_sources(['Fe'], [[0, 0, 0]], ['dz2']), budget=100000)
+        while c.step():
+            pass
+    record(results, 'electron_cloud/Fe-dz2-100k', cloud, repeat)
+    # 캐시된 s/p 등치면을 결합 방향으로 배치하는 혼성 오비탈 (원자 전체)
+    path = os.path.join(DATA_DIR, 'caffeine.sdf')
+    if os.path.exists(path):
+        with open(path) as f:
+            caffeine = mvs.parse_molecule(f.read())
+        record(results, 'hybrid_orbital_meshes/caffeine',
+               lambda: [mvs.hybrid_orbital_meshes(caffeine, i) for i in range(len(caffeine.atoms))], repeat)
+        record(results, 'orbital_batch/caffeine-ppi',
+               lambda: mvs.orbital_batch(caffeine, range(len(caffeine.atoms)), ['ppi']), repeat)
+        ids = list(range(len(caffeine.atoms)))
+        symbols = [a.symbol for a in caffeine.atoms]
+        record(results, 'orbital_volume/caffeine-ppi',
+               lambda: mvs.orbital_volume(mvs.orbital_placements(symbols, caffeine.positions, ['ppi'],
+                                                                 mvs.pi_normals(caffeine, ids))), repeat)
+    # 결합수 2/3/4인 중심 원자 1000개에 대한 정사면체 맞춤
+    rng = np.random.default_rng(1)
+    cases = []
+    for k in range(1000):
+        n = 2 + k % 3
+        cases.append((np.zeros(3), rng.normal(size=(n, 3))))
+    record(results, 'make_regular_tetrahedron/x1000',
+           lambda: [mvs.make_regular_tetrahedron(c, nb) for c, nb in cases], repeat)
+
+
+def run_benchmarks(sizes, repeat=None, redraw=True, data_dir=DATA_DIR):
+    mvs = load_app_module()
+    harness = RedrawHarness(mvs) if redraw else None
+    results = {}
+    for n in sizes:
+        symbols, positions, bonds = synthetic_molecule(n)
+        rdkit_mol = to_rdkit(symbols, positions, bonds)
+        molecule = mvs.Molecule.from_arrays(symbols, positions, bonds)
+        bench_molecule(mvs, results, f'n={n}', molecule, rdkit_mol, repeat or default_repeat(n), harness)
+    if os.path.isdir(data_dir):
+        for name in sorted(os.listdir(data_dir)):
+            if not name.endswith('.sdf'):
+                continue
+            with open(os.path.join(data_dir, name)) as f:
+                text = f.read()
+            label = os.path.splitext(name)[0]
+            record(results, f'parse_molecule/{label}', lambda: mvs.parse_molecule(text), repeat or 5)
+            bench_molecule(mvs, results, label, mvs.parse_molecule(text), mvs.parse_mol(text), repeat or 5, harness)
+    bench_fixed(mvs, results, repeat or 3)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'sizes': list(sizes),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, tolerance=1.3, floor_s=1e-3):
+    """
+    median 기준 비교. 기준보다 tolerance배 넘게 느리고 차이가 floor_s보다 크면 회귀로 본다.
+    반환값: (보고 줄 목록, 회귀 항목 목록)
+    """
+    lines, regressions = [], []
+    base = baseline['results']
+    for key, cur in current['results'].items():
+        if key not in base:
+            continue
+        old, new = base[key]['median_s'], cur['median_s']
+        ratio = new / old if old > 0 else float('inf')
+        flag = ''
+        if ratio > tolerance and new - old > floor_s:
+            flag = '  <-- 회귀'
+            regressions.append(key)
+        lines.append(f"{key:<44}{old * 1000:10.2f} ms{new * 1000:10.2f} ms{ratio:7.2f}x{flag}")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='3DMVS 성능 벤치마크')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='합성 분자 원자 수')
+    parser.add_argument('--repeat', type=int, default=None, help='항목별 반복 횟수 (기본: 크기에 따라 자동)')
+    parser.add_argument('--no-redraw', action='store_true', help='오프스크린 redraw 측정 생략')
+    parser.add_argument('--out', help='결과 JSON 저장 경로 (기본: 표준출력)')
+    parser.add_argument('--save-baseline', metavar='PATH', help='결과를 기준값으로 저장')
+    parser.add_argument('--baseline', metavar='PATH', help='비교할 기준값 JSON')
+    parser.add_argument('--tolerance', type=float, default=1.3, help='허용 배율 (기본 1.3)')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.sizes, args.repeat, redraw=not args.no_redraw)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+    elif not args.save_baseline and not args.baseline:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        lines, regressions = compare(report, baseline, args.tolerance)
+        print('\n'.join(lines), file=sys.stderr)
+        if regressions:
+            print(f"회귀 {len(regressions)}건: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,8 +1,5 @@
 import sys
 import numpy as np
-import pubchempy as pcp
-import requests
-from rdkit import Chem
 from collections import Counter
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTextEdit, QLineEdit, QPushButton, QCheckBox, QLabel, QFrame
 from PyQt5.QtGui import QFont, QPalette, QColor
@@ -422,6 +419,7 @@ def fetch_3d_sdf_and_iupac_any(inp):
         inp = KOR_TO_ENG[key]
     if inp in MOLECULE_CACHE:
         return MOLECULE_CACHE[inp]
+    import pubchempy as pcp
     tried = []
     for search_type in ['name', 'formula', 'smiles', 'cid']:
         try:
@@ -460,6 +458,7 @@ def _fetch_sdf_and_names(comp, inp, input_type='name'):
         getattr(comp, 'synonyms', [])[0].lower() if getattr(comp, 'synonyms', None) else '',
         str(cid)
     ])
+    import requests
     url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/cid/{cid}/SDF?record_type=3d"
     resp = requests.get(url, timeout=10)
     if resp.status_code != 200:
@@ -470,6 +469,7 @@ def _fetch_sdf_and_names(comp, inp, input_type='name'):
     return sdf_text, iupac_name, formula, synonyms, input_type
 
 def parse_mol(sdf_text):
+    from rdkit import Chem
     mol = Chem.MolFromMolBlock(sdf_text, removeHs=False)
     if mol is None:
         raise ValueError("RDKit이 SDF 텍스트를 파싱하지 못했습니다.")